@@ -19,8 +19,25 @@ DATABASE_PATH = os.path.join(BASE_PROJECT_DIR, "data", "scheduler_bot.db")
 UPLOADS_DIR = os.path.join(BASE_PROJECT_DIR, "data", "uploads")
 GENERATED_SCHEDULES_DIR = os.path.join(BASE_PROJECT_DIR, "data", "generated_schedules")
 CORE_CONFIGS_DIR = os.path.join(BASE_PROJECT_DIR, "configs") # Путь к конфигам для schedule_core
+RESULT_CACHE_DIR = os.path.join(BASE_PROJECT_DIR, "data", "result_cache") # Кэш готовых расписаний
+
+# Кол-во процессов для генерации расписаний (0 - генерация в потоке внутри процесса бота)
+try:
+    GENERATION_POOL_WORKERS = max(0, int(os.getenv("GENERATION_POOL_WORKERS", "2")))
+except ValueError:
+    print("Ошибка: GENERATION_POOL_WORKERS в .env файле должен быть числом.")
+    GENERATION_POOL_WORKERS = 2
+
+# Ограничения кэша результатов: общий размер (МБ) и срок хранения записи (дни)
+try:
+    RESULT_CACHE_MAX_SIZE_MB = max(0, int(os.getenv("RESULT_CACHE_MAX_SIZE_MB", "200")))
+    RESULT_CACHE_MAX_AGE_DAYS = max(0, int(os.getenv("RESULT_CACHE_MAX_AGE_DAYS", "14")))
+except ValueError:
+    print("Ошибка: RESULT_CACHE_MAX_SIZE_MB и RESULT_CACHE_MAX_AGE_DAYS в .env файле должны быть числами.")
+    RESULT_CACHE_MAX_SIZE_MB, RESULT_CACHE_MAX_AGE_DAYS = 200, 14
 
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 os.makedirs(GENERATED_SCHEDULES_DIR, exist_ok=True)
 os.makedirs(CORE_CONFIGS_DIR, exist_ok=True)
+os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
 os.makedirs(os.path.join(BASE_PROJECT_DIR, "data"), exist_ok=True) # Для scheduler_bot.db
\ No newline at end of file
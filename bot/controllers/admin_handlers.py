@@ -13,7 +13,7 @@ from datetime import datetime
 from bot.models import db
 from bot.views import messages, keyboards
 from bot.config import ADMIN_IDS
-from bot.utils import file_manager
+from bot.utils import file_manager, result_cache
 
 USERS_PER_PAGE = 10
 TASKS_PER_PAGE = 5
@@ -572,6 +572,16 @@ async def cmd_view_feedback(message: types.Message, command: BotCommand = None,
     await _send_unread_feedback(message)
 
 
+@admin_only
+async def cmd_cache_stats(message: types.Message, command: BotCommand = None, state: FSMContext = None, **kwargs):
+    stats = result_cache.get_cache_stats()
+    total_requests = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / total_requests * 100 if total_requests else 0.0
+    await message.answer(messages.ADMIN_CACHE_STATS.format(
+        hits=stats["hits"], misses=stats["misses"], hit_rate=escape_md(f"{hit_rate:.1f}"),
+        entries=stats["entries"], size_mb=escape_md(f"{stats['size_mb']:.1f}")), parse_mode=ParseMode.MARKDOWN_V2)
+
+
 @admin_only
 async def callback_feedback_actions(call: types.CallbackQuery, state: FSMContext = None,
                                     **kwargs):  # Объединенный хэндлер
@@ -725,6 +735,7 @@ def register_admin_handlers(dp: Dispatcher):
     dp.register_message_handler(cmd_force_cancel_task, Command(commands=['force_cancel_task']), state="*")
     dp.register_message_handler(cmd_broadcast, Command(commands=['broadcast']), state="*")
     dp.register_message_handler(cmd_view_feedback, Command(commands=['view_feedback']), state="*")
+    dp.register_message_handler(cmd_cache_stats, Command(commands=['cache_stats']), state="*")
     dp.register_callback_query_handler(callback_feedback_actions, Text(startswith=CB_PREFIX_FEEDBACK),
                                        state="*")  # Объединенный
     dp.register_message_handler(process_admin_reply_text, state=AdminReplyStates.waiting_for_reply_text,
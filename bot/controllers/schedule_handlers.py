@@ -10,6 +10,7 @@ from aiogram.utils.markdown import html_decoration as hd
 from bot.models import db, algorithm_runner
 from bot.views import messages, keyboards
 from bot.utils import file_manager
+from schedule_core.feasibility import analyse_input_files, format_feasibility_report
 from bot.config import ADMIN_IDS  # Если потребуется для каких-то проверок здесь
 
 
@@ -98,6 +99,20 @@ async def process_weekdays_file(message: types.Message, state: FSMContext, **kwa
     file_path = save_result["path"]
     db.update_task_add_file(task_id, "weekdays", file_path)
     db.update_task_status(task_id, "pending_files")
+    task_info = db.get_task_info(task_id)
+    if task_info and task_info[1]:
+        # Быстрая проверка выполнимости до подтверждения с теми же параметрами, что получит генерация.
+        # Предупреждения только показываются; отказ - если данные заведомо невыполнимы по общим границам.
+        feasibility_report = await asyncio.get_running_loop().run_in_executor(
+            None, analyse_input_files, task_info[1], file_path, algorithm_runner.resolve_algo_params())
+        await message.answer(messages.FEASIBILITY_REPORT.format(
+            task_id=task_id, report=hd.quote(format_feasibility_report(feasibility_report))), parse_mode=ParseMode.HTML)
+        if feasibility_report["status"] != "ok":
+            db.update_task_status(task_id, "failed", "Входные данные невыполнимы")
+            await state.finish()
+            await message.answer(messages.FEASIBILITY_REJECTED.format(task_id=task_id),
+                                 reply_markup=keyboards.main_menu_kb())
+            return
     await ScheduleCreationStates.confirm_generation.set()
     await message.answer(messages.FILES_UPLOADED_CONFIRM.format(task_id=task_id),
                          reply_markup=keyboards.confirm_schedule_generation_kb(task_id))
@@ -7,6 +7,7 @@ from aiogram.types import BotCommandScopeAllPrivateChats, BotCommandScopeChat
 
 from bot.config import BOT_TOKEN, ADMIN_IDS
 from bot.models.db import init_db
+from bot.models.algorithm_runner import shutdown_generation_pool
 from bot.controllers import common_handlers, schedule_handlers, admin_handlers
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
@@ -34,6 +35,7 @@ async def on_startup(dp: Dispatcher):
             # types.BotCommand("delete_task_data", "🗑️ Удалить данные задачи"), # Удалена, т.к. теперь через task_info
             types.BotCommand("broadcast", "📢 Рассылка сообщения"),
             types.BotCommand("view_feedback", "📬 Просмотреть отзывы"),
+            types.BotCommand("cache_stats", "🗄️ Статистика кэша расписаний"),
         ]
         all_admin_commands = common_commands + admin_specific_commands
         for admin_id in ADMIN_IDS:
@@ -43,6 +45,7 @@ async def on_startup(dp: Dispatcher):
 
 async def on_shutdown(dp: Dispatcher):
     logger.warning('Бот остановлен.'); await dp.storage.close(); await dp.storage.wait_closed(); logger.info("Хранилище FSM закрыто.")
+    shutdown_generation_pool(); logger.info("Пул генерации расписаний остановлен.")
 
 def main():
     if not BOT_TOKEN: logger.critical("Ошибка: BOT_TOKEN не найден."); exit("Критическая ошибка: BOT_TOKEN не найден.")
@@ -1,10 +1,132 @@
+import os
 import asyncio
 import logging
-from schedule_core.main_timetable import generate_full_schedule
-from bot.config import CORE_CONFIGS_DIR
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from schedule_core.main_timetable import generate_full_schedule, generate_full_schedule_sync
+from bot.config import CORE_CONFIGS_DIR, GENERATION_POOL_WORKERS
+from bot.utils import result_cache
 
 logger = logging.getLogger(__name__)
 
+PROGRESS_POLL_INTERVAL = 0.5  # Как часто (сек) забирать сообщения прогресса из очереди воркера
+
+_generation_pool = None
+_progress_manager = None
+
+
+def _get_generation_pool() -> ProcessPoolExecutor:
+    global _generation_pool, _progress_manager
+    if _generation_pool is None:
+        logger.info(f"Запуск пула генерации расписаний: {GENERATION_POOL_WORKERS} процесс(ов).")
+        _generation_pool = ProcessPoolExecutor(max_workers=GENERATION_POOL_WORKERS)
+    if _progress_manager is None:
+        _progress_manager = multiprocessing.Manager()
+    return _generation_pool
+
+
+def _reset_generation_pool():
+    global _generation_pool
+    if _generation_pool is not None:
+        _generation_pool.shutdown(wait=False, cancel_futures=True)
+    _generation_pool = None
+
+
+def shutdown_generation_pool():
+    global _progress_manager
+    _reset_generation_pool()
+    if _progress_manager is not None:
+        _progress_manager.shutdown()
+    _progress_manager = None
+
+
+def _run_generation_in_worker(generation_kwargs: dict, progress_queue) -> dict:
+    # Выполняется в отдельном процессе: прогресс уходит в очередь, результат возвращается через pickle.
+    return generate_full_schedule_sync(progress_callback=progress_queue.put, **generation_kwargs)
+
+
+async def _forward_progress_updates(progress_queue, progress_callback: callable):
+    while True:
+        try:
+            status_text = progress_queue.get_nowait()
+        except queue.Empty:
+            return
+        if progress_callback:
+            try:
+                await progress_callback(status_text)
+            except Exception as e:
+                logger.warning(f"Не удалось отправить обновление прогресса: {e}")
+
+
+async def _run_in_generation_pool(generation_kwargs: dict, progress_callback: callable) -> dict:
+    loop = asyncio.get_running_loop()
+    pool = _get_generation_pool()
+    progress_queue = _progress_manager.Queue()
+    future = loop.run_in_executor(pool, _run_generation_in_worker, generation_kwargs, progress_queue)
+    while True:
+        worker_finished = future.done()
+        await _forward_progress_updates(progress_queue, progress_callback)
+        if worker_finished: break
+        await asyncio.sleep(PROGRESS_POLL_INTERVAL)
+    try:
+        return await future
+    except BrokenProcessPool:
+        _reset_generation_pool()
+        raise
+
+
+DEFAULT_ALGO_PARAMS = {
+    "filter_target_year_prefixes": None, "filter_required_room_prefix": None,
+    "aco_weekdays_iterations": 75, "aco_weekdays_target_daily_total": 30,
+    "aco_weekdays_max_weekday_lessons": 2, "aco_weekdays_max_weekend_lessons": 3,
+    "aco_weekdays_fitness_variance_penalty": 0.1,
+    "aco_weekdays_engine": "local_search",  # 'local_search', 'numpy' или 'python'
+    "aco_weekdays_capacity_aware": True,
+    "aco_daily_num_ants": 10, "aco_daily_num_iterations": 30,
+    "aco_daily_evaporation_rate": 0.1, "aco_daily_pheromone_deposit": 100.0,
+    "aco_daily_alpha": 1.0, "aco_daily_beta": 1.0,
+    "aco_daily_penalty_unplaced": 20, "aco_daily_penalty_window": 5,
+    "aco_daily_penalty_max_lessons_coeff": 3, "aco_daily_soft_limit_max_lessons": 4,
+    "aco_daily_penalty_slot_underutil_coeff": 30, "aco_daily_slot_util_threshold": 0.6,
+    "default_tag_weight_for_priority_calc": 1,
+    "aco_daily_max_consecutive_lessons": 2,  # Новый
+    "aco_daily_penalty_consecutive": 7,  # Новый
+    "aco_daily_parallel_workers": None,  # None - ядра делятся между процессами пула генерации (_default_day_workers)
+    "random_seed": None,  # None - зерно из содержимого файлов и параметров (result_cache.derive_random_seed)
+    "aco_daily_time_limit": None, "aco_daily_stagnation_iterations": None,
+    "generation_time_budget": None,  # Общий бюджет времени (сек) на задачу, делится между днями
+    "aco_daily_local_search": None,  # None, 'hill_climbing' или 'tabu'
+    "aco_daily_local_search_time_limit": 1.0, "aco_daily_local_search_max_steps": 5000,
+    "aco_daily_tabu_tenure": 10,
+    "aco_daily_lesson_ordering": "random",  # 'random', 'priority' или 'most_constrained'
+    "aco_daily_assignment_mode": "joint",  # 'joint' или 'slot_then_room'
+    "aco_daily_candidate_list_size": None, "aco_daily_candidate_list_refresh": 5,
+    "aco_daily_islands": 1, "aco_daily_island_exchange_interval": 10,
+    "aco_daily_engine": "ants",  # 'ants' или 'batched'
+    "feasibility_check": True,  # Отклонять заведомо невыполнимые входные данные
+    "aco_daily_decompose": True,  # Кластеры групп без общих аудиторий решаются отдельно
+    "aco_daily_pheromone_update": "top_ants",  # 'top_ants' или 'mmas' (для MMAS лучше aco_daily_evaporation_rate ~0.3)
+    "aco_daily_mmas_deposit_source": "iteration_best",  # 'iteration_best' или 'global_best'
+    "aco_daily_mmas_p_best": 0.05, "aco_daily_mmas_reinit_iterations": 25,
+    "scheduling_mode": "daily"  # 'daily' или 'weekly' (одна колония на неделю, без квот по дням)
+}
+
+
+def _default_day_workers() -> int:
+    # Пул дней живет внутри процесса пула генерации: одновременно идут до GENERATION_POOL_WORKERS задач,
+    # поэтому каждой достается своя доля ядер, а не все ядра машины
+    return max(1, (os.cpu_count() or 1) // max(1, GENERATION_POOL_WORKERS))
+
+
+def resolve_algo_params(custom_params: dict | None = None) -> dict:
+    # Параметры генерации: значения по умолчанию с поверх наложенными custom_params.
+    # Тот же словарь используют предварительная проверка данных и сама генерация.
+    current_algo_params = DEFAULT_ALGO_PARAMS.copy()
+    if custom_params: current_algo_params.update(custom_params)
+    return current_algo_params
+
 
 async def run_schedule_generation_async(
         groups_file_path: str,
@@ -15,56 +137,83 @@ async def run_schedule_generation_async(
         custom_params: dict | None = None
 ) -> dict:
     logger.debug(f"DEBUG_RUNNER: algorithm_runner вызван для task_id={task_id} с custom_params: {custom_params}")
-    loop = asyncio.get_event_loop()
-    default_algo_params = {
-        "filter_target_year_prefixes": None, "filter_required_room_prefix": None,
-        "aco_weekdays_iterations": 75, "aco_weekdays_target_daily_total": 30,
-        "aco_weekdays_max_weekday_lessons": 2, "aco_weekdays_max_weekend_lessons": 3,
-        "aco_weekdays_fitness_variance_penalty": 0.1,
-        "aco_daily_num_ants": 10, "aco_daily_num_iterations": 30,
-        "aco_daily_evaporation_rate": 0.1, "aco_daily_pheromone_deposit": 100.0,
-        "aco_daily_alpha": 1.0, "aco_daily_beta": 1.0,
-        "aco_daily_penalty_unplaced": 20, "aco_daily_penalty_window": 5,
-        "aco_daily_penalty_max_lessons_coeff": 3, "aco_daily_soft_limit_max_lessons": 4,
-        "aco_daily_penalty_slot_underutil_coeff": 30, "aco_daily_slot_util_threshold": 0.6,
-        "default_tag_weight_for_priority_calc": 1,
-        "aco_daily_max_consecutive_lessons": 2,  # Новый
-        "aco_daily_penalty_consecutive": 7  # Новый
-    }
-    current_algo_params = default_algo_params.copy()
-    if custom_params: current_algo_params.update(custom_params)
+    current_algo_params = resolve_algo_params(custom_params)
+    if current_algo_params["random_seed"] is None:
+        current_algo_params["random_seed"] = result_cache.derive_random_seed(groups_file_path, weekdays_file_path,
+                                                                             current_algo_params)
+    generation_kwargs = dict(
+        groups_csv_path=groups_file_path, weekdays_csv_path=weekdays_file_path, output_dir=output_dir,
+        task_id_for_progress=task_id,
+        filter_target_year_prefixes=current_algo_params["filter_target_year_prefixes"],
+        filter_required_room_prefix=current_algo_params["filter_required_room_prefix"],
+        aco_weekdays_iterations=current_algo_params["aco_weekdays_iterations"],
+        aco_weekdays_target_daily_total=current_algo_params["aco_weekdays_target_daily_total"],
+        aco_weekdays_max_weekday_lessons=current_algo_params["aco_weekdays_max_weekday_lessons"],
+        aco_weekdays_max_weekend_lessons=current_algo_params["aco_weekdays_max_weekend_lessons"],
+        aco_weekdays_fitness_variance_penalty=current_algo_params["aco_weekdays_fitness_variance_penalty"],
+        aco_weekdays_engine=current_algo_params["aco_weekdays_engine"],
+        aco_weekdays_capacity_aware=current_algo_params["aco_weekdays_capacity_aware"],
+        aco_daily_num_ants=current_algo_params["aco_daily_num_ants"],
+        aco_daily_num_iterations=current_algo_params["aco_daily_num_iterations"],
+        aco_daily_evaporation_rate=current_algo_params["aco_daily_evaporation_rate"],
+        aco_daily_pheromone_deposit=current_algo_params["aco_daily_pheromone_deposit"],
+        aco_daily_alpha=current_algo_params["aco_daily_alpha"],
+        aco_daily_beta=current_algo_params["aco_daily_beta"],
+        aco_daily_penalty_unplaced=current_algo_params["aco_daily_penalty_unplaced"],
+        aco_daily_penalty_window=current_algo_params["aco_daily_penalty_window"],
+        aco_daily_penalty_max_lessons_coeff=current_algo_params["aco_daily_penalty_max_lessons_coeff"],
+        aco_daily_soft_limit_max_lessons=current_algo_params["aco_daily_soft_limit_max_lessons"],
+        aco_daily_penalty_slot_underutil_coeff=current_algo_params["aco_daily_penalty_slot_underutil_coeff"],
+        aco_daily_slot_util_threshold=current_algo_params["aco_daily_slot_util_threshold"],
+        default_tag_weight_for_priority_calc=current_algo_params["default_tag_weight_for_priority_calc"],
+        aco_daily_max_consecutive_lessons=current_algo_params["aco_daily_max_consecutive_lessons"],  # Новый
+        aco_daily_penalty_consecutive=current_algo_params["aco_daily_penalty_consecutive"],  # Новый
+        aco_daily_parallel_workers=current_algo_params["aco_daily_parallel_workers"] or _default_day_workers(),
+        random_seed=current_algo_params["random_seed"],
+        aco_daily_time_limit=current_algo_params["aco_daily_time_limit"],
+        aco_daily_stagnation_iterations=current_algo_params["aco_daily_stagnation_iterations"],
+        time_budget_seconds=current_algo_params["generation_time_budget"],
+        aco_daily_local_search=current_algo_params["aco_daily_local_search"],
+        aco_daily_local_search_time_limit=current_algo_params["aco_daily_local_search_time_limit"],
+        aco_daily_local_search_max_steps=current_algo_params["aco_daily_local_search_max_steps"],
+        aco_daily_tabu_tenure=current_algo_params["aco_daily_tabu_tenure"],
+        aco_daily_lesson_ordering=current_algo_params["aco_daily_lesson_ordering"],
+        aco_daily_assignment_mode=current_algo_params["aco_daily_assignment_mode"],
+        aco_daily_candidate_list_size=current_algo_params["aco_daily_candidate_list_size"],
+        aco_daily_candidate_list_refresh=current_algo_params["aco_daily_candidate_list_refresh"],
+        aco_daily_islands=current_algo_params["aco_daily_islands"],
+        aco_daily_island_exchange_interval=current_algo_params["aco_daily_island_exchange_interval"],
+        aco_daily_engine=current_algo_params["aco_daily_engine"],
+        feasibility_check=current_algo_params["feasibility_check"],
+        aco_daily_decompose=current_algo_params["aco_daily_decompose"],
+        aco_daily_pheromone_update=current_algo_params["aco_daily_pheromone_update"],
+        aco_daily_mmas_deposit_source=current_algo_params["aco_daily_mmas_deposit_source"],
+        aco_daily_mmas_p_best=current_algo_params["aco_daily_mmas_p_best"],
+        aco_daily_mmas_reinit_iterations=current_algo_params["aco_daily_mmas_reinit_iterations"],
+        scheduling_mode=current_algo_params["scheduling_mode"]
+    )
+    cache_key = result_cache.compute_cache_key(groups_file_path, weekdays_file_path, current_algo_params)
+    if cache_key:
+        cached_result = result_cache.get_cached_result(cache_key, output_dir)
+        if cached_result:
+            logger.info(f"Task_{task_id}: расписание взято из кэша (ключ {cache_key[:12]}).")
+            if progress_callback:
+                try:
+                    await progress_callback(f"Задача #{task_id}\nНайден готовый результат для тех же входных данных. Завершено.")
+                except Exception as e:
+                    logger.warning(f"Не удалось отправить обновление прогресса: {e}")
+            return cached_result
     try:
-        logger.debug(f"DEBUG_RUNNER: Перед вызовом (await) generate_full_schedule с параметрами: {current_algo_params}")
-        result = await generate_full_schedule(
-            groups_file_path, weekdays_file_path, output_dir,
-            progress_callback, task_id,
-            filter_target_year_prefixes=current_algo_params["filter_target_year_prefixes"],
-            filter_required_room_prefix=current_algo_params["filter_required_room_prefix"],
-            aco_weekdays_iterations=current_algo_params["aco_weekdays_iterations"],
-            aco_weekdays_target_daily_total=current_algo_params["aco_weekdays_target_daily_total"],
-            aco_weekdays_max_weekday_lessons=current_algo_params["aco_weekdays_max_weekday_lessons"],
-            aco_weekdays_max_weekend_lessons=current_algo_params["aco_weekdays_max_weekend_lessons"],
-            aco_weekdays_fitness_variance_penalty=current_algo_params["aco_weekdays_fitness_variance_penalty"],
-            aco_daily_num_ants=current_algo_params["aco_daily_num_ants"],
-            aco_daily_num_iterations=current_algo_params["aco_daily_num_iterations"],
-            aco_daily_evaporation_rate=current_algo_params["aco_daily_evaporation_rate"],
-            aco_daily_pheromone_deposit=current_algo_params["aco_daily_pheromone_deposit"],
-            aco_daily_alpha=current_algo_params["aco_daily_alpha"],
-            aco_daily_beta=current_algo_params["aco_daily_beta"],
-            aco_daily_penalty_unplaced=current_algo_params["aco_daily_penalty_unplaced"],
-            aco_daily_penalty_window=current_algo_params["aco_daily_penalty_window"],
-            aco_daily_penalty_max_lessons_coeff=current_algo_params["aco_daily_penalty_max_lessons_coeff"],
-            aco_daily_soft_limit_max_lessons=current_algo_params["aco_daily_soft_limit_max_lessons"],
-            aco_daily_penalty_slot_underutil_coeff=current_algo_params["aco_daily_penalty_slot_underutil_coeff"],
-            aco_daily_slot_util_threshold=current_algo_params["aco_daily_slot_util_threshold"],
-            default_tag_weight_for_priority_calc=current_algo_params["default_tag_weight_for_priority_calc"],
-            aco_daily_max_consecutive_lessons=current_algo_params["aco_daily_max_consecutive_lessons"],  # Новый
-            aco_daily_penalty_consecutive=current_algo_params["aco_daily_penalty_consecutive"]  # Новый
-        )
+        if GENERATION_POOL_WORKERS > 0:
+            logger.debug(f"DEBUG_RUNNER: Запуск generate_full_schedule_sync в пуле процессов с параметрами: {current_algo_params}")
+            result = await _run_in_generation_pool(generation_kwargs, progress_callback)
+        else:
+            logger.debug(f"DEBUG_RUNNER: Перед вызовом (await) generate_full_schedule с параметрами: {current_algo_params}")
+            result = await generate_full_schedule(progress_callback=progress_callback, **generation_kwargs)
         logger.debug(
-            f"DEBUG_RUNNER: Прямой вызов (await) generate_full_schedule завершен. Результат: {result.get('status')}")
+            f"DEBUG_RUNNER: Вызов generate_full_schedule завершен. Результат: {result.get('status')}")
+        if cache_key: result_cache.store_result(cache_key, result)
         return result
     except Exception as e:
-        import traceback
         logger.error(f"DEBUG_RUNNER: ИСКЛЮЧЕНИЕ при вызове generate_full_schedule: {e}", exc_info=True)
-        return {"status": "error", "message": f"Внутренняя ошибка runner: {type(e).__name__}"}
\ No newline at end of file
+        return {"status": "error", "message": f"Внутренняя ошибка runner: {type(e).__name__}"}
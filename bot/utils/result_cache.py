@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import glob
+import pickle
+import shutil
+import hashlib
+import logging
+from bot.config import RESULT_CACHE_DIR, RESULT_CACHE_MAX_SIZE_MB, RESULT_CACHE_MAX_AGE_DAYS, CORE_CONFIGS_DIR
+
+logger = logging.getLogger(__name__)
+
+RESULT_FILENAME = "result.pkl"
+STATS_PATH = os.path.join(RESULT_CACHE_DIR, "stats.json")
+# Параметры, которые не влияют на итоговое расписание и не входят в ключ
+PARAMS_EXCLUDED_FROM_KEY = {"aco_daily_parallel_workers"}
+# Входит в ключ: увеличивать при изменениях алгоритма или формата результата, чтобы не отдавать старые расписания
+CACHE_VERSION = 1
+
+
+def _hash_file(hasher, file_path: str):
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+
+
+def compute_cache_key(groups_file_path: str, weekdays_file_path: str, algo_params: dict) -> str | None:
+    # Ключ = sha256 от версии кэша, содержимого входных файлов, configs/*.csv, параметров алгоритма и зерна ГСЧ
+    try:
+        hasher = hashlib.sha256()
+        hasher.update(f"version\0{CACHE_VERSION}\0".encode())
+        for file_path in (groups_file_path, weekdays_file_path):
+            hasher.update(b"input\0")
+            _hash_file(hasher, file_path)
+        for config_path in sorted(glob.glob(os.path.join(CORE_CONFIGS_DIR, "*.csv"))):
+            hasher.update(f"config\0{os.path.basename(config_path)}\0".encode())
+            _hash_file(hasher, config_path)
+        key_params = {k: v for k, v in algo_params.items() if k not in PARAMS_EXCLUDED_FROM_KEY}
+        hasher.update(json.dumps(key_params, sort_keys=True, default=str).encode())
+        return hasher.hexdigest()
+    except OSError as e:
+        logger.warning(f"Кэш: не удалось вычислить ключ: {e}")
+        return None
+
+
+def derive_random_seed(groups_file_path: str, weekdays_file_path: str, algo_params: dict) -> int | None:
+    # Зерно для запуска без random_seed: из ключа тех же данных и параметров, поэтому повторная загрузка
+    # тех же файлов воспроизводит (и берет из кэша) прежнее расписание
+    content_key = compute_cache_key(groups_file_path, weekdays_file_path, dict(algo_params, random_seed=None))
+    return int(content_key[:8], 16) if content_key else None
+
+
+def _load_stats() -> dict:
+    try:
+        with open(STATS_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"hits": 0, "misses": 0}
+
+
+def _increment_stat(name: str):
+    stats = _load_stats()
+    stats[name] = stats.get(name, 0) + 1
+    try:
+        with open(STATS_PATH, "w", encoding="utf-8") as f:
+            json.dump(stats, f)
+    except OSError as e:
+        logger.warning(f"Кэш: не удалось сохранить статистику: {e}")
+
+
+def _entry_dirs() -> list:
+    return [os.path.join(RESULT_CACHE_DIR, name) for name in os.listdir(RESULT_CACHE_DIR)
+            if ".tmp" not in name and os.path.isdir(os.path.join(RESULT_CACHE_DIR, name))]
+
+
+def _dir_size(dir_path: str) -> int:
+    return sum(os.path.getsize(os.path.join(dir_path, name)) for name in os.listdir(dir_path))
+
+
+def get_cached_result(cache_key: str, output_dir: str) -> dict | None:
+    # При попадании копирует Excel-файлы в папку задачи и возвращает результат с новыми путями
+    entry_dir = os.path.join(RESULT_CACHE_DIR, cache_key)
+    try:
+        with open(os.path.join(entry_dir, RESULT_FILENAME), "rb") as f:
+            cached_result = pickle.load(f)
+        os.makedirs(output_dir, exist_ok=True)
+        task_files = []
+        for file_name in cached_result["files"]:
+            task_file_path = os.path.join(output_dir, file_name)
+            shutil.copyfile(os.path.join(entry_dir, file_name), task_file_path)
+            task_files.append(task_file_path)
+        os.utime(entry_dir)  # Для вытеснения давно не использованных записей
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError) as e:
+        if os.path.exists(entry_dir): logger.warning(f"Кэш: запись {cache_key[:12]} повреждена, удаляется: {e}")
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        _increment_stat("misses")
+        return None
+    _increment_stat("hits")
+    return dict(cached_result, files=task_files)
+
+
+def store_result(cache_key: str, result: dict):
+    if result.get("status") != "success": return
+    entry_dir = os.path.join(RESULT_CACHE_DIR, cache_key)
+    tmp_dir = f"{entry_dir}.tmp{os.getpid()}"
+    try:
+        os.makedirs(tmp_dir, exist_ok=True)
+        file_names = []
+        for file_path in result.get("files", []):
+            file_names.append(os.path.basename(file_path))
+            shutil.copyfile(file_path, os.path.join(tmp_dir, file_names[-1]))
+        with open(os.path.join(tmp_dir, RESULT_FILENAME), "wb") as f:
+            pickle.dump(dict(result, files=file_names), f)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+    except (OSError, pickle.PicklingError) as e:
+        logger.warning(f"Кэш: не удалось сохранить результат: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+    evict_expired_entries()
+
+
+def evict_expired_entries():
+    # Сначала удаляются записи старше срока хранения, затем самые давние, пока кэш не влезет в лимит размера
+    now = time.time()
+    entries = []
+    for entry_dir in _entry_dirs():
+        try:
+            last_used = os.path.getmtime(entry_dir)
+            if RESULT_CACHE_MAX_AGE_DAYS and now - last_used > RESULT_CACHE_MAX_AGE_DAYS * 86400:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            entries.append((last_used, _dir_size(entry_dir), entry_dir))
+        except OSError:
+            continue
+    total_size = sum(size for _, size, _ in entries)
+    max_size = RESULT_CACHE_MAX_SIZE_MB * 1024 * 1024
+    for _, size, entry_dir in sorted(entries):
+        if total_size <= max_size: break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total_size -= size
+
+
+def get_cache_stats() -> dict:
+    stats = _load_stats()
+    entries, total_size = 0, 0
+    for entry_dir in _entry_dirs():
+        try:
+            total_size += _dir_size(entry_dir)
+            entries += 1
+        except OSError:
+            continue
+    return {"hits": stats.get("hits", 0), "misses": stats.get("misses", 0), "entries": entries,
+            "size_mb": total_size / (1024 * 1024)}
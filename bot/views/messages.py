@@ -36,7 +36,8 @@ ADMIN_HELP_MESSAGE = (
     "`/list_tasks` \- 📋 Список всех задач в системе \\(с фильтрами и пагинацией\\)\\.\n"
     "`/force_cancel_task ID [причина]` \- 🚫 Принудительно изменить статус задачи на 'failed\\_by\\_admin' \\(причина необязательна\\)\\.\n"
     "`/broadcast сообщение` \- 📢 Отправить сообщение всем активным пользователям \\(сообщение после команды\\)\\.\n"
-    "`/view_feedback` \- 📬 Просмотреть новые \\(непрочитанные\\) отзывы\\.\n\n"
+    "`/view_feedback` \- 📬 Просмотреть новые \\(непрочитанные\\) отзывы\\.\n"
+    "`/cache_stats` \- 🗄️ Статистика кэша готовых расписаний\\.\n\n"
     "ℹ️ *Процесс создания расписания \\(для информации\\):*\n"
     "1\\. Пользователь нажимает «📅 Новое расписание»\\.\n"
     "2\\. Последовательно загружает два файла \\(CSV или XLSX\\)\\.\n"
@@ -51,6 +52,8 @@ UPLOAD_GROUPS_FILE = "1️⃣ Сначала, пожалуйста, загруз
 UPLOAD_WEEKDAYS_FILE = "2️⃣ Файл групп принят\\! Теперь, пожалуйста, загрузите *файл с данными о днях недели и аудиториях* \\(CSV или XLSX\\)\\.\nИли кнопку «❌ Отменить текущее»\\."
 FILES_UPLOADED_CONFIRM = "✅ Все файлы успешно загружены для Задачи \\#{task_id}\\!\nГотовы начать генерацию расписания?" # # нужно экранировать, но он внутри {}, поэтому может быть ок
 GENERATION_CONFIRM_PROMPT = "Нажмите кнопку '🚀 Запустить генерацию\\!' ниже, чтобы начать\\. Это может занять некоторое время\\.\nИли `/cancel`, чтобы отменить и вернуться в главное меню\\."
+FEASIBILITY_REPORT = "🔎 Предварительная проверка данных для Задачи #{task_id}:\n<pre>{report}</pre>"
+FEASIBILITY_REJECTED = "❌ Генерация для Задачи #{task_id} не будет запущена: по этим данным полное расписание составить невозможно. Исправьте файлы и начните заново через «📅 Новое расписание»."
 USER_MESSAGE_GENERATION_STARTED = "⚙️ Генерация расписания для Задачи \\#{task_id} запущена\\! Я буду держать вас в курсе\\."
 GENERATION_SUCCESS = "🎉 Расписание для Задачи \\#{task_id} успешно сгенерировано\\!\nОтправляю вам файлы \\(по одному на каждый день недели\\)..."
 GENERATION_FAILED = "😥 К сожалению, при генерации расписания для Задачи \\#{task_id} произошла ошибка:\n\n```\n{error_message}\n```\n\nПожалуйста, проверьте ваши входные файлы и попробуйте еще раз, нажав «📅 Новое расписание»\\. Если ошибка повторяется, обратитесь к администратору\\."
@@ -99,6 +102,7 @@ FEEDBACK_RECEIVED = "📬 Спасибо за ваш отзыв\\! Мы его 
 FEEDBACK_EMPTY = "⚠️ Вы не написали текст отзыва\\. Попробуйте еще раз или нажмите «❌ Отменить текущее»\\."
 FEEDBACK_FORWARDED_TO_ADMIN = "📬 Новый отзыв от {user_display} \\(ID: `{user_id}`\\):\n\n```\n{feedback_text}\n```\n\nОтметить как прочитанный: `/mark_feedback_viewed {feedback_id}`"
 ADMIN_NO_UNREAD_FEEDBACK = "✅ Нет новых непрочитанных отзывов\\."
+ADMIN_CACHE_STATS = "🗄️ *Кэш готовых расписаний*\nПопаданий: {hits}\nПромахов: {misses}\nДоля попаданий: {hit_rate}%\nЗаписей: {entries} \\({size_mb} МБ\\)"
 ADMIN_FEEDBACK_VIEWED = "✅ Отзыв \\#{feedback_id} помечен как прочитанный\\."
 ADMIN_FEEDBACK_VIEW_ERROR = "⚠️ Не удалось пометить отзыв \\#{feedback_id} как прочитанный\\."
 BROADCAST_STARTED = "📢 Начинаю рассылку сообщения для {count} активных пользователей\\.\\.\\."
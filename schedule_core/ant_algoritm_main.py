@@ -1,26 +1,65 @@
-import random
-import copy
+import time
 import logging
+import numpy as np
+from .matching import hopcroft_karp, augment_from
 
 logger = logging.getLogger(__name__)
 
+LESSON_ORDERINGS = ('random', 'priority', 'most_constrained')
+ASSIGNMENT_MODES = ('joint', 'slot_then_room')
+ENGINES = ('ants', 'batched')
+PHEROMONE_UPDATES = ('top_ants', 'mmas')
+MMAS_DEPOSIT_SOURCES = ('iteration_best', 'global_best')
+BATCHED_MAX_SLOTS = 62  # Маски занятых слотов групп у движка 'batched' хранятся в int64
+WEEK_CACHE_SIZE = 50000  # multi_day: предел кэшей по недельным маскам слотов группы (очищаются при переполнении)
+
+
+def utilization_penalty(placed_lessons_count: int, total_possible_placements: int, slot_utilization_threshold: float,
+                        penalty_slot_underutilization_coeff: float) -> float:
+    # Штраф дня за недозагрузку слотов групп; вынесен из Scheduler для склейки независимых кластеров дня
+    utilization_ratio = placed_lessons_count / total_possible_placements if total_possible_placements > 0 else 1.0
+    if utilization_ratio < slot_utilization_threshold:
+        return (1.0 - utilization_ratio) * penalty_slot_underutilization_coeff
+    return 0.0
+
 
 class Ant:
-    def __init__(self, lessons_to_schedule_for_ant: dict, group_available_times: dict, group_available_rooms: dict,
-                 special_room_overrides: dict):
-        self.lessons_to_schedule = copy.deepcopy(lessons_to_schedule_for_ant)
-        self.group_available_times = copy.deepcopy(group_available_times)
-        self.group_available_rooms = copy.deepcopy(group_available_rooms)
-        self.special_room_overrides = special_room_overrides
-        self.schedule = {}
-        self.path = []
+    # Муравей хранит только свое назначение; данные задачи дня общие и лежат в Scheduler
+    __slots__ = ('rng', 'slot_of', 'room_of', 'group_busy', 'room_busy', 'group_slot_bits', 'group_penalties',
+                 'soft_penalty', 'placed_count', 'fitness', 'constraints_violated')
+
+    def __init__(self, num_lessons: int, num_groups: int, num_slots: int, num_rooms: int, rng: np.random.Generator):
+        self.rng = rng
+        # Назначение урока i: slot_of[i], room_of[i] (-1 - не размещен)
+        self.slot_of = np.full(num_lessons, -1, dtype=np.int32)
+        self.room_of = np.full(num_lessons, -1, dtype=np.int32)
+        # Занятость: group_busy[группа, слот], room_busy[аудитория, слот]
+        self.group_busy = np.zeros((num_groups, num_slots), dtype=bool)
+        self.room_busy = np.zeros((num_rooms, num_slots), dtype=bool)
+        # Счетчики для инкрементальной оценки: битовая маска занятых слотов и штраф каждой группы
+        self.group_slot_bits = [0] * num_groups
+        self.group_penalties = [0.0] * num_groups
+        self.soft_penalty = 0.0
+        self.placed_count = 0
         self.fitness = float('inf')
         self.constraints_violated = 0
 
-    def add_lesson_to_schedule(self, time_slot: str, group: str, lesson_info: dict, room_info: dict):
-        if time_slot not in self.schedule: self.schedule[time_slot] = []
-        self.schedule[time_slot].append({'group': group, 'lesson': lesson_info, 'room': room_info})
-        self.path.append((group, lesson_info, time_slot, room_info))
+    def add_lesson_to_schedule(self, lesson_idx: int, group_idx: int, slot_idx: int, room_idx: int):
+        self.slot_of[lesson_idx] = slot_idx
+        self.room_of[lesson_idx] = room_idx
+        self.group_busy[group_idx, slot_idx] = True
+        self.room_busy[room_idx, slot_idx] = True
+        self.group_slot_bits[group_idx] |= 1 << slot_idx
+        self.placed_count += 1
+
+    def remove_lesson_from_schedule(self, lesson_idx: int, group_idx: int):
+        slot_idx, room_idx = int(self.slot_of[lesson_idx]), int(self.room_of[lesson_idx])
+        self.slot_of[lesson_idx] = -1
+        self.room_of[lesson_idx] = -1
+        self.group_busy[group_idx, slot_idx] = False
+        self.room_busy[room_idx, slot_idx] = False
+        self.group_slot_bits[group_idx] &= ~(1 << slot_idx)
+        self.placed_count -= 1
 
 
 class Scheduler:
@@ -44,7 +83,26 @@ class Scheduler:
                  # Новый параметр для этого улучшения
                  max_consecutive_lessons_for_group: int = 2,
                  # Макс. пар подряд без штрафа (3я и далее будут штрафоваться)
-                 penalty_consecutive_lessons: int = 7  # Штраф за каждую "лишнюю" пару подряд
+                 penalty_consecutive_lessons: int = 7,  # Штраф за каждую "лишнюю" пару подряд
+                 random_seed: int | None = None,
+                 time_limit_seconds: float | None = None,  # Ограничение времени run_aco (None - без ограничения)
+                 stagnation_iterations: int | None = None,  # Остановка после N итераций без улучшения
+                 local_search_mode: str | None = None,  # Доводка лучшего решения: None, 'hill_climbing' или 'tabu'
+                 local_search_time_limit: float = 1.0,  # Отдельный лимит времени (сек) на доводку
+                 local_search_max_steps: int = 5000,
+                 local_search_sample_size: int = 20,  # Сколько случайных ходов рассматривается на шаге
+                 tabu_tenure: int = 10,  # Сколько шагов нельзя вернуть урок в покинутый слот
+                 lesson_ordering: str = 'random',  # Порядок уроков: 'random', 'priority' или 'most_constrained'
+                 assignment_mode: str = 'joint',  # 'joint' - пара (слот, аудитория); 'slot_then_room' - слот, затем паросочетание
+                 candidate_list_size: int | None = None,  # ACS: k лучших вариантов (слот, аудитория) на пару (None - все)
+                 candidate_list_refresh: int = 5,  # Перестраивать списки кандидатов раз в N итераций
+                 engine: str = 'ants',  # 'ants' - муравьи по одному; 'batched' - все муравьи итерации одновременно
+                 pheromone_update: str = 'top_ants',  # 'top_ants' - откладывают 10% лучших; 'mmas' - Max-Min Ant System
+                 mmas_deposit_source: str = 'iteration_best',  # MMAS: откладывает лучший итерации или лучший за запуск
+                 mmas_p_best: float = 0.05,  # MMAS: вероятность построить лучшее решение при сходимости (задает tau_min)
+                 mmas_reinit_iterations: int | None = 25,  # MMAS: сброс феромона к tau_max после N итераций без улучшения
+                 multi_day: bool = False,  # Слоты - пары (номер дня, время); окна, серии и лимит пар считаются по дням
+                 day_lesson_limits: list | None = None  # multi_day: жесткий лимит пар группы для каждого дня
                  ):
         self.lessons_for_day_by_group = lessons_for_day_by_group
         self.group_available_times_on_day = group_available_times_on_day
@@ -64,192 +122,834 @@ class Scheduler:
         self.slot_utilization_threshold = slot_utilization_threshold
         self.max_consecutive_lessons_for_group = max_consecutive_lessons_for_group
         self.penalty_consecutive_lessons = penalty_consecutive_lessons
+        self.random_seed = random_seed
+        self._seed_sequence = np.random.SeedSequence(random_seed)
+        self.time_limit_seconds = time_limit_seconds
+        self.stagnation_iterations = stagnation_iterations
+        self.iterations_done = 0
+        self.stop_reason = None
+        self.local_search_mode = local_search_mode
+        self.local_search_time_limit = local_search_time_limit
+        self.local_search_max_steps = local_search_max_steps
+        self.local_search_sample_size = local_search_sample_size
+        self.tabu_tenure = tabu_tenure
+        if lesson_ordering not in LESSON_ORDERINGS:
+            raise ValueError(f"Неизвестный порядок уроков '{lesson_ordering}', допустимы: {', '.join(LESSON_ORDERINGS)}")
+        self.lesson_ordering = lesson_ordering
+        if assignment_mode not in ASSIGNMENT_MODES:
+            raise ValueError(f"Неизвестный режим назначения '{assignment_mode}', допустимы: {', '.join(ASSIGNMENT_MODES)}")
+        self.assignment_mode = assignment_mode
+        self.candidate_list_size = candidate_list_size
+        self.candidate_list_refresh = max(1, candidate_list_refresh)
+        self.candidate_slots = self.candidate_rooms = None
+        if engine not in ENGINES:
+            raise ValueError(f"Неизвестный движок '{engine}', допустимы: {', '.join(ENGINES)}")
+        if engine == 'batched' and (assignment_mode != 'joint' or lesson_ordering == 'most_constrained' or candidate_list_size):
+            raise ValueError("Движок 'batched' поддерживает только assignment_mode='joint', порядок 'random'/'priority' "
+                             "и работу без списков кандидатов")
+        self.engine = engine
+        if pheromone_update not in PHEROMONE_UPDATES:
+            raise ValueError(f"Неизвестное правило обновления феромона '{pheromone_update}', допустимы: {', '.join(PHEROMONE_UPDATES)}")
+        if mmas_deposit_source not in MMAS_DEPOSIT_SOURCES:
+            raise ValueError(f"Неизвестный источник отложения MMAS '{mmas_deposit_source}', допустимы: {', '.join(MMAS_DEPOSIT_SOURCES)}")
+        if pheromone_update == 'mmas' and not (0 < evaporation_rate < 1 and 0 < mmas_p_best < 1):
+            raise ValueError("Для MMAS evaporation_rate и mmas_p_best должны быть в интервале (0, 1)")
+        self.pheromone_update = pheromone_update
+        self.mmas_deposit_source = mmas_deposit_source
+        self.mmas_p_best = mmas_p_best
+        self.mmas_reinit_iterations = mmas_reinit_iterations
+        self._tau_min = self._tau_max = None
+        self.multi_day = multi_day
+        self.day_lesson_limits = day_lesson_limits
 
-        self.pheromone_matrix = {}
+        self.pheromone_matrix = None
         self.ants = []
         self.best_schedule_for_day = {}
         self.best_fitness_for_day = float('inf')
+        self._build_index()
         self._initialize_pheromones()
+        if self.engine == 'batched' and (len(self.slot_names) > BATCHED_MAX_SLOTS or self.multi_day):
+            logger.warning(f"ACO Daily: {len(self.slot_names)} слотов > {BATCHED_MAX_SLOTS} или несколько дней, движок 'batched' заменен на 'ants'")
+            self.engine = 'ants'
+        if self.engine == 'batched' and not (self.slot_names and self.room_catalogue):
+            # Векторной рулетке нужна хотя бы одна клетка (слот, аудитория); 'ants' такие дни обрабатывает сам
+            logger.warning("ACO Daily: нет слотов или аудиторий, движок 'batched' заменен на 'ants'")
+            self.engine = 'ants'
+
+    def _build_index(self):
+        # Группы, пары (группа, предмет), слоты и аудитории получают целочисленные id,
+        # чтобы феромон хранился в плотном массиве NumPy, а не в словарях словарей.
+        self.group_names = list(self.lessons_for_day_by_group.keys())
+        self.group_index = {group_name: idx for idx, group_name in enumerate(self.group_names)}
+        unique_day_time_slots_set = set()
+        for group_slots in self.group_available_times_on_day.values():
+            unique_day_time_slots_set.update(group_slots)
+        self.slot_names = sorted(unique_day_time_slots_set)
+        self.slot_index = {time_slot: idx for idx, time_slot in enumerate(self.slot_names)}
+        # Блоки слотов по дням (номер дня, первый слот, маска из числа слотов дня): слоты (день, время)
+        # отсортированы по дням, поэтому каждый день - непрерывный диапазон битов в group_slot_bits
+        day_slot_counts = {}
+        for time_slot in self.slot_names:
+            day_idx = time_slot[0] if self.multi_day else 0
+            day_slot_counts[day_idx] = day_slot_counts.get(day_idx, 0) + 1
+        self.day_slot_blocks, first_slot_idx = [], 0
+        for day_idx, day_slot_count in day_slot_counts.items():
+            self.day_slot_blocks.append((day_idx, first_slot_idx, (1 << day_slot_count) - 1))
+            first_slot_idx += day_slot_count
+        self.room_catalogue = []
+        self.room_index = {}
+        for group_name in self.group_names:
+            for room_info in self.group_available_rooms_on_day.get(group_name, []):
+                if room_info['name'] not in self.room_index:
+                    self.room_index[room_info['name']] = len(self.room_catalogue)
+                    self.room_catalogue.append(room_info)
+        self.lesson_keys = []
+        self.lesson_key_index = {}
+        for group_name, lessons_list in self.lessons_for_day_by_group.items():
+            for lesson_info in lessons_list:
+                pheromone_key = (group_name, lesson_info['name'])
+                if pheromone_key not in self.lesson_key_index:
+                    self.lesson_key_index[pheromone_key] = len(self.lesson_keys)
+                    self.lesson_keys.append(pheromone_key)
+        # Статические маски доступности: group_slot_mask[группа, слот], group_room_mask[группа, аудитория]
+        self.group_slot_mask = np.zeros((len(self.group_names), len(self.slot_names)), dtype=bool)
+        self.group_room_mask = np.zeros((len(self.group_names), len(self.room_catalogue)), dtype=bool)
+        for group_idx, group_name in enumerate(self.group_names):
+            for time_slot in self.group_available_times_on_day.get(group_name, []):
+                self.group_slot_mask[group_idx, self.slot_index[time_slot]] = True
+            for room_info in self.group_available_rooms_on_day.get(group_name, []):
+                self.group_room_mask[group_idx, self.room_index[room_info['name']]] = True
+        # Константы оценки, которые раньше пересчитывались для каждого муравья
+        self.total_lessons_to_place = sum(len(l_list) for l_list in self.lessons_for_day_by_group.values())
+        self.total_possible_placements = sum(len(times) for times in self.group_available_times_on_day.values())
+        self._group_penalty_cache = {}
+        self._group_penalty_bits_cache = {}
+        # Плоский список уроков дня: урок i = lesson_items[i] = (группа, lesson_info)
+        self.lesson_items = [(group_name, lesson_info) for group_name, lessons_list in self.lessons_for_day_by_group.items()
+                             for lesson_info in lessons_list]
+        self.lesson_group_ids = np.array([self.group_index[group_name] for group_name, _ in self.lesson_items], dtype=np.int32)
+        self.lesson_key_ids = np.array([self.lesson_key_index[(group_name, lesson_info['name'])]
+                                        for group_name, lesson_info in self.lesson_items], dtype=np.int32)
+        for shared_array in (self.group_slot_mask, self.group_room_mask, self.lesson_group_ids, self.lesson_key_ids):
+            shared_array.flags.writeable = False
+        self._build_compatibility_index()
+        self._best_assignment = None
+        # Нижняя граница фитнеса: все уроки размещены, мягких штрафов и нарушений нет
+        self.fitness_lower_bound = self._utilization_penalty(self.total_lessons_to_place)
 
     def _initialize_pheromones(self):
         initial_pheromone_value = 1.0
-        for group_name, lessons_list in self.lessons_for_day_by_group.items():
+        # pheromone_matrix[пара, слот, аудитория]; нули - недоступные группе слоты/аудитории
+        self.pheromone_matrix = np.zeros((len(self.lesson_keys), len(self.slot_names), len(self.room_catalogue)))
+        for key_idx, (group_name, _) in enumerate(self.lesson_keys):
             available_times_for_group = self.group_available_times_on_day.get(group_name, [])
             available_rooms_for_group = self.group_available_rooms_on_day.get(group_name, [])
             if not available_times_for_group or not available_rooms_for_group: continue
-            unique_lesson_names_in_group = set()
-            for lesson_info in lessons_list: unique_lesson_names_in_group.add(lesson_info['name'])
-            for lesson_name_str in unique_lesson_names_in_group:
-                pheromone_key = (group_name, lesson_name_str)
-                self.pheromone_matrix[pheromone_key] = {}
-                for time_slot in available_times_for_group:
-                    for room_info in available_rooms_for_group:
-                        time_room_key = (time_slot, room_info['name'])
-                        self.pheromone_matrix[pheromone_key][time_room_key] = initial_pheromone_value
+            slot_ids = [self.slot_index[time_slot] for time_slot in available_times_for_group]
+            room_ids = [self.room_index[room_info['name']] for room_info in available_rooms_for_group]
+            self.pheromone_matrix[key_idx][np.ix_(slot_ids, room_ids)] = initial_pheromone_value
+        # Для MMAS: ячейки, которые держатся в границах [tau_min, tau_max]; остальные остаются нулями
+        self._pheromone_available = self.pheromone_matrix > 0 if self.pheromone_update == 'mmas' else None
+        logger.debug(f"ACO Daily: феромон {self.pheromone_matrix.shape}, {self.pheromone_matrix.nbytes / 1024:.1f} КБ")
 
     def _create_ants(self):
         self.ants = []
-        for _ in range(self.num_ants):
-            ant = Ant(lessons_to_schedule_for_ant=self.lessons_for_day_by_group,
-                      group_available_times=self.group_available_times_on_day,
-                      group_available_rooms=self.group_available_rooms_on_day,
-                      special_room_overrides=self.special_room_overrides)
+        for ant_seed in self._seed_sequence.spawn(self.num_ants):
+            ant = Ant(num_lessons=len(self.lesson_items), num_groups=len(self.group_names),
+                      num_slots=len(self.slot_names), num_rooms=len(self.room_catalogue),
+                      rng=np.random.default_rng(ant_seed))
             self.ants.append(ant)
 
+    def _check_stop_condition(self, deadline: float | None, iterations_without_improvement: int) -> (str | None):
+        if self.best_fitness_for_day <= self.fitness_lower_bound + 1e-9: return "достигнута нижняя граница фитнеса"
+        if deadline is not None and time.perf_counter() >= deadline: return "исчерпан лимит времени"
+        if self.stagnation_iterations and iterations_without_improvement >= self.stagnation_iterations:
+            return f"нет улучшений {iterations_without_improvement} итераций"
+        return None
+
     def run_aco(self):
-        for iteration in range(self.num_iterations):
-            self._create_ants()
-            for ant in self.ants:
-                self._construct_schedule_for_ant(ant)
-                ant.fitness = self._evaluate_schedule(ant.schedule, ant.constraints_violated)
-                if ant.fitness < self.best_fitness_for_day:
-                    self.best_fitness_for_day = ant.fitness
-                    self.best_schedule_for_day = copy.deepcopy(ant.schedule)
-            self._update_pheromones()
+        self.begin_run()
+        self.run_iterations(self.num_iterations)
+        return self.finish_run()
+
+    def begin_run(self):
+        self._deadline = time.perf_counter() + self.time_limit_seconds if self.time_limit_seconds is not None else None
+        self._iterations_without_improvement = 0
+
+    def run_iterations(self, max_iterations: int) -> bool:
+        # Выполняет до max_iterations итераций колонии; True - запуск завершен (лимит итераций или досрочная остановка).
+        # По частям итерации выполняет островная модель между обменами решениями.
+        for _ in range(max_iterations):
+            if self.stop_reason or self.iterations_done >= self.num_iterations: break
+            iteration = self.iterations_done
+            iteration_start_time = time.perf_counter()
+            best_fitness_before_iteration = self.best_fitness_for_day
+            if self.candidate_list_size:
+                if iteration % self.candidate_list_refresh == 0: self._rebuild_candidate_lists()
+                self._refresh_candidate_scores()
+            if self.engine == 'batched':
+                self._run_batched_iteration()
+            else:
+                self._create_ants()
+                for ant in self.ants:
+                    self._construct_schedule_for_ant(ant)
+                    ant.fitness = self._evaluate_ant(ant)
+                    if ant.fitness < self.best_fitness_for_day:
+                        self.best_fitness_for_day = ant.fitness
+                        self._best_assignment = (ant.slot_of.copy(), ant.room_of.copy())
+                self._update_pheromones()
+            self.iterations_done = iteration + 1
+            if self.best_fitness_for_day < best_fitness_before_iteration: self._iterations_without_improvement = 0
+            else: self._iterations_without_improvement += 1
+            if (self.pheromone_update == 'mmas' and self.mmas_reinit_iterations and self._iterations_without_improvement
+                    and self._iterations_without_improvement % self.mmas_reinit_iterations == 0 and self._tau_max is not None):
+                self._reset_pheromones_to_max()
+                logger.debug(f"ACO Daily: MMAS - сброс феромона к tau_max={self._tau_max:.4g} на итерации {iteration + 1}")
             if (iteration + 1) % 10 == 0 or iteration == self.num_iterations - 1:
                 logger.debug(
-                    f"ACO Daily Iteration {iteration + 1}/{self.num_iterations}, Best Fitness: {self.best_fitness_for_day:.2f}")
+                    f"ACO Daily Iteration {iteration + 1}/{self.num_iterations}, Best Fitness: {self.best_fitness_for_day:.2f}, "
+                    f"время итерации: {time.perf_counter() - iteration_start_time:.3f} с")
+            self.stop_reason = self._check_stop_condition(self._deadline, self._iterations_without_improvement)
+            if self.stop_reason:
+                logger.debug(f"ACO Daily: досрочная остановка на итерации {iteration + 1}/{self.num_iterations} - {self.stop_reason}")
+        return bool(self.stop_reason) or self.iterations_done >= self.num_iterations
+
+    def accept_migrant(self, slot_of: np.ndarray, room_of: np.ndarray, fitness: float):
+        # Лучшее решение другого острова: становится лучшим, если оно лучше своего, и усиливает свой феромон
+        if fitness < self.best_fitness_for_day:
+            self.best_fitness_for_day = fitness
+            self._best_assignment = (slot_of.copy(), room_of.copy())
+            self._iterations_without_improvement = 0
+        self._deposit_pheromone(slot_of, room_of, fitness)
+        if self._tau_max is not None: self._clamp_pheromones()
+
+    def finish_run(self) -> dict:
+        if self.local_search_mode and self._best_assignment is not None:
+            self._run_local_search()
+        if self._best_assignment is not None:
+            self.best_schedule_for_day = self._assignment_to_schedule(*self._best_assignment)
         if not self.best_schedule_for_day and any(self.lessons_for_day_by_group.values()):
             logger.warning(
                 f"Не удалось составить расписание для дня (ACO Daily), хотя были уроки. Фитнес: {self.best_fitness_for_day}")
         return self.best_schedule_for_day
 
-    def _is_placement_valid(self, current_ant_schedule: dict, group_to_place: str, time_slot: str,
-                            room_info_to_place: dict, lesson_info_to_place: dict) -> bool:
-        if time_slot in current_ant_schedule:
-            for scheduled_item in current_ant_schedule[time_slot]:
-                if scheduled_item['group'] == group_to_place: return False
-        if time_slot in current_ant_schedule:
-            for scheduled_item in current_ant_schedule[time_slot]:
-                if scheduled_item['room']['name'] == room_info_to_place['name']: return False
-        required_tags = lesson_info_to_place.get('required_tags', [])
-        if not required_tags: return True
-        available_room_tags = set(room_info_to_place.get('tags', []))
-        if not all(req_tag in available_room_tags for req_tag in required_tags): return False
-        return True
+    def _is_placement_valid(self, ant: Ant, lesson_idx: int, slot_idx: int, room_idx: int) -> bool:
+        group_idx = self.lesson_group_ids[lesson_idx]
+        if ant.group_busy[group_idx, slot_idx] or ant.room_busy[room_idx, slot_idx]: return False
+        return bool(self.group_slot_mask[group_idx, slot_idx] and self.lesson_room_mask[lesson_idx, room_idx])
 
     def _get_target_room_for_special_override(self, lesson_name: str) -> (str | None):
         return self.special_room_overrides.get(lesson_name)
 
+    def _build_compatibility_index(self):
+        # Теги оборудования получают номера битов; для каждой сигнатуры урока (требуемые теги, спец. аудитория)
+        # один раз строится маска подходящих аудиторий каталога. Во внутреннем цикле остаются только маски.
+        self.tag_bits = {}
+        room_tag_bits = []
+        for room_info in self.room_catalogue:
+            room_bits = 0
+            for tag in room_info.get('tags', []):
+                room_bits |= 1 << self.tag_bits.setdefault(tag, len(self.tag_bits))
+            room_tag_bits.append(room_bits)
+        signature_index = {}
+        signature_room_masks = []
+        signature_required_bits = []
+        lesson_signature_ids = []
+        lesson_override_room_ids = []
+        for _, lesson_info in self.lesson_items:
+            override_room_name = self._get_target_room_for_special_override(lesson_info['name'])
+            signature = (frozenset(lesson_info.get('required_tags', [])), override_room_name)
+            if signature not in signature_index:
+                required_bits = 0
+                for tag in signature[0]:
+                    required_bits |= 1 << self.tag_bits.setdefault(tag, len(self.tag_bits))
+                room_mask = np.array([room_bits & required_bits == required_bits for room_bits in room_tag_bits],
+                                     dtype=bool)
+                if override_room_name:
+                    override_room_idx = self.room_index.get(override_room_name)
+                    override_only_mask = np.zeros_like(room_mask)
+                    if override_room_idx is not None: override_only_mask[override_room_idx] = room_mask[override_room_idx]
+                    room_mask = override_only_mask
+                signature_index[signature] = len(signature_room_masks)
+                signature_room_masks.append(room_mask)
+                signature_required_bits.append(required_bits)
+            lesson_signature_ids.append(signature_index[signature])
+            lesson_override_room_ids.append(self.room_index.get(override_room_name, -1) if override_room_name else None)
+        num_rooms = len(self.room_catalogue)
+        self.signature_room_masks = np.array(signature_room_masks, dtype=bool).reshape(len(signature_room_masks), num_rooms)
+        self.lesson_signature_ids = np.array(lesson_signature_ids, dtype=np.int32)
+        # lesson_room_mask[урок, аудитория]: аудитория доступна группе урока и подходит по оборудованию/назначению
+        self.lesson_room_mask = (self.signature_room_masks[self.lesson_signature_ids]
+                                 & self.group_room_mask[self.lesson_group_ids])
+        # Спец. аудитория урока недоступна его группе - урок не размещается (штраф 100)
+        self.lesson_override_missing = np.array(
+            [override_room_idx is not None and (override_room_idx < 0 or not self.group_room_mask[group_idx, override_room_idx])
+             for override_room_idx, group_idx in zip(lesson_override_room_ids, self.lesson_group_ids.tolist())],
+            dtype=bool)
+        for shared_array in (self.signature_room_masks, self.lesson_signature_ids, self.lesson_room_mask,
+                             self.lesson_override_missing):
+            shared_array.flags.writeable = False
+        self._build_heuristic_tables(room_tag_bits, signature_required_bits)
+        self._build_ordering_tables()
+        # Для 'slot_then_room': аудитории урока в порядке предпочтения (меньше лишнего оборудования - раньше)
+        self.lesson_room_lists = [
+            sorted(np.flatnonzero(self.lesson_room_mask[lesson_idx]).tolist(),
+                   key=lambda room_idx, sig=self.lesson_signature_ids[lesson_idx]: -self.signature_room_eta_beta[sig, room_idx])
+            for lesson_idx in range(len(self.lesson_items))]
+        room_list_index = {}
+        self.lesson_room_list_ids = [room_list_index.setdefault(tuple(room_list), len(room_list_index))
+                                     for room_list in self.lesson_room_lists]
+
+    def _build_ordering_tables(self):
+        # Веса для 'priority': 1 + placement_priority, уроки со спец. аудиторией - с максимальным весом
+        priority_weights = np.array([1.0 + lesson_info.get('placement_priority', 0) for _, lesson_info in self.lesson_items])
+        has_override = np.array([self._get_target_room_for_special_override(lesson_info['name']) is not None
+                                 for _, lesson_info in self.lesson_items], dtype=bool)
+        if priority_weights.size: priority_weights[has_override] = priority_weights.max()
+        self.lesson_priority_weights = priority_weights
+        # Для 'most_constrained': уроки каждой группы и начальное число вариантов (слот, аудитория) урока
+        self.group_lesson_ids = [np.flatnonzero(self.lesson_group_ids == group_idx) for group_idx in range(len(self.group_names))]
+        self.lesson_room_counts = self.lesson_room_mask.sum(axis=1).astype(np.int64)
+        # Номер блока дня у каждого слота: заполненный до day_lesson_limits день закрывает группе весь блок
+        self.slot_block_ids = np.repeat(np.arange(len(self.day_slot_blocks)),
+                                        [block_mask.bit_length() for _, _, block_mask in self.day_slot_blocks])
+        group_open_slots = self.group_slot_mask
+        if self.day_lesson_limits is not None: group_open_slots = group_open_slots & ~self._full_day_slots_for_bits(0)
+        self.initial_candidate_counts = group_open_slots.sum(axis=1)[self.lesson_group_ids] * self.lesson_room_counts
+        for shared_array in (self.lesson_priority_weights, self.lesson_room_counts, self.initial_candidate_counts):
+            shared_array.flags.writeable = False
+
+    def _build_heuristic_tables(self, room_tag_bits: list, signature_required_bits: list):
+        # Эвристика eta[слот, аудитория] = дефицит слота * близость к парам группы * экономия оборудования.
+        # Все множители заранее возведены в степень beta; во внутреннем цикле остается одно умножение.
+        lessons_per_group = np.bincount(self.lesson_group_ids, minlength=len(self.group_names))
+        slot_demand = (self.group_slot_mask * lessons_per_group[:, None]).sum(axis=0)
+        # Слоты, которые могут занять немногие группы, предпочтительнее (дефицитные слоты остаются для остальных)
+        slot_scarcity = np.sqrt(max(1, slot_demand.min(initial=1)) / np.maximum(slot_demand, 1))
+        self.slot_scarcity_eta_beta = np.power(slot_scarcity, self.beta)
+        # Аудитории с лишним оборудованием менее предпочтительны: 1 / (1 + число лишних тегов)
+        surplus_tags = np.array([[bin(room_bits & ~required_bits).count('1') for room_bits in room_tag_bits]
+                                 for required_bits in signature_required_bits], dtype=float)
+        self.signature_room_eta_beta = np.power(1.0 / (1.0 + surplus_tags), self.beta).reshape(
+            len(signature_required_bits), len(self.room_catalogue))
+        self._slot_eta_beta_cache = {}
+        self._week_slot_eta_beta_cache = {}
+        self._week_full_day_slots_cache = {}
+        for shared_array in (self.slot_scarcity_eta_beta, self.signature_room_eta_beta):
+            shared_array.flags.writeable = False
+
+    def _slot_eta_beta_for_bits(self, slot_bits: int) -> np.ndarray:
+        # Множитель слотов для группы с занятыми слотами slot_bits: соседние с ее парами слоты (меньше окон)
+        # получают 1, дальние - 1 / расстояние. Для multi_day множитель собирается по дням: расстояние считается
+        # только внутри дня, а кэш по маскам дня остается маленьким (недельные маски почти не повторяются).
+        if not self.multi_day: return self._block_slot_eta_beta(0, slot_bits, (1 << len(self.slot_names)) - 1)
+        slot_eta_beta = self._week_slot_eta_beta_cache.get(slot_bits)
+        if slot_eta_beta is None:
+            if len(self._week_slot_eta_beta_cache) >= WEEK_CACHE_SIZE: self._week_slot_eta_beta_cache.clear()
+            slot_eta_beta = np.concatenate([self._block_slot_eta_beta(first_slot_idx, slot_bits >> first_slot_idx & block_mask, block_mask)
+                                            for _, first_slot_idx, block_mask in self.day_slot_blocks])
+            self._week_slot_eta_beta_cache[slot_bits] = slot_eta_beta
+        return slot_eta_beta
+
+    def _full_day_slots_for_bits(self, slot_bits: int) -> np.ndarray:
+        # multi_day: маска слотов тех дней, где у группы уже day_lesson_limits[день] пар
+        full_day_slots = self._week_full_day_slots_cache.get(slot_bits)
+        if full_day_slots is None:
+            if len(self._week_full_day_slots_cache) >= WEEK_CACHE_SIZE: self._week_full_day_slots_cache.clear()
+            full_day_slots = np.zeros(len(self.slot_names), dtype=bool)
+            for day_idx, first_slot_idx, block_mask in self.day_slot_blocks:
+                if bin(slot_bits >> first_slot_idx & block_mask).count('1') >= self.day_lesson_limits[day_idx]:
+                    full_day_slots[first_slot_idx:first_slot_idx + block_mask.bit_length()] = True
+            self._week_full_day_slots_cache[slot_bits] = full_day_slots
+        return full_day_slots
+
+    def _group_free_slots(self, ant: Ant, group_idx: int) -> np.ndarray:
+        # Слоты, куда группа может поставить еще одну пару: доступные, не занятые и не в заполненный день
+        free_slots = self.group_slot_mask[group_idx] & ~ant.group_busy[group_idx]
+        if self.day_lesson_limits is not None: free_slots &= ~self._full_day_slots_for_bits(ant.group_slot_bits[group_idx])
+        return free_slots
+
+    def _block_slot_eta_beta(self, first_slot_idx: int, block_bits: int, block_mask: int) -> np.ndarray:
+        # Множитель слотов блока [first_slot_idx, first_slot_idx + число слотов); запоминается по битовой маске блока
+        cache_key = (first_slot_idx, block_bits)
+        slot_eta_beta = self._slot_eta_beta_cache.get(cache_key)
+        if slot_eta_beta is None:
+            block_scarcity_eta_beta = self.slot_scarcity_eta_beta[first_slot_idx:first_slot_idx + block_mask.bit_length()]
+            busy_slot_ids = [idx for idx in range(block_mask.bit_length()) if block_bits >> idx & 1]
+            if busy_slot_ids:
+                distance = np.abs(np.arange(block_mask.bit_length())[:, None] - np.array(busy_slot_ids)[None, :]).min(axis=1)
+                slot_eta_beta = block_scarcity_eta_beta * np.power(1.0 / np.maximum(distance, 1), self.beta)
+            else:
+                slot_eta_beta = block_scarcity_eta_beta
+            self._slot_eta_beta_cache[cache_key] = slot_eta_beta
+        return slot_eta_beta
+
+    def _get_free_candidates_mask(self, ant: Ant, group_idx: int, room_mask: np.ndarray) -> np.ndarray:
+        # Маска [слот, аудитория] свободных вариантов размещения урока группы для муравья
+        free_slots = self._group_free_slots(ant, group_idx)
+        return free_slots[:, None] & room_mask[None, :] & ~ant.room_busy.T
+
+    def _assignment_to_schedule(self, slot_of: np.ndarray, room_of: np.ndarray) -> dict:
+        schedule = {}
+        for lesson_idx in np.flatnonzero(slot_of >= 0).tolist():
+            group_name, lesson_info = self.lesson_items[lesson_idx]
+            schedule.setdefault(self.slot_names[slot_of[lesson_idx]], []).append(
+                {'group': group_name, 'lesson': lesson_info, 'room': self.room_catalogue[room_of[lesson_idx]]})
+        return schedule
+
+    def _iter_lessons_for_ant(self, ant: Ant, phase_slot_of: np.ndarray | None = None):
+        # Порядок обхода уроков муравьем. 'priority' - взвешенная случайная перестановка
+        # (Efraimidis-Spirakis: ключ -ln(u)/w, по возрастанию); 'most_constrained' - каждый раз урок
+        # с наименьшим числом оставшихся вариантов, счетчики обновляются по размещенному уроку.
+        # phase_slot_of - слоты первого этапа 'slot_then_room' (аудитории там назначаются позже).
+        num_lessons = len(self.lesson_items)
+        if self.lesson_ordering == 'random': return iter(ant.rng.permutation(num_lessons).tolist())
+        if self.lesson_ordering == 'priority':
+            return iter(np.argsort(-np.log(ant.rng.random(num_lessons)) / self.lesson_priority_weights, kind='stable').tolist())
+        if phase_slot_of is not None: return self._iter_most_constrained_slot_lessons(ant, phase_slot_of)
+        return self._iter_most_constrained_lessons(ant)
+
+    def _initial_closed_slots(self) -> np.ndarray | None:
+        # Для 'most_constrained' с day_lesson_limits: [группа, слот] - слот в заполненном дне группы
+        if self.day_lesson_limits is None: return None
+        return np.tile(self._full_day_slots_for_bits(0), (len(self.group_names), 1))
+
+    def _close_full_day_slots(self, ant: Ant, group_idx: int, slot_idx: int, closed_slots: np.ndarray) -> np.ndarray:
+        # Если урок в slot_idx заполнил день группы до лимита, ее свободные слоты этого дня закрываются
+        # (_group_free_slots их больше не дает); возвращает только что закрытые слоты
+        day_idx, first_slot_idx, block_mask = self.day_slot_blocks[self.slot_block_ids[slot_idx]]
+        if bin(ant.group_slot_bits[group_idx] >> first_slot_idx & block_mask).count('1') < self.day_lesson_limits[day_idx]:
+            return np.empty(0, dtype=np.int64)
+        day_slots = slice(first_slot_idx, first_slot_idx + block_mask.bit_length())
+        closed_now = np.flatnonzero(self.group_slot_mask[group_idx, day_slots] & ~ant.group_busy[group_idx, day_slots]
+                                    & ~closed_slots[group_idx, day_slots]) + first_slot_idx
+        closed_slots[group_idx, day_slots] = True
+        return closed_now
+
+    def _iter_most_constrained_lessons(self, ant: Ant):
+        num_lessons = len(self.lesson_items)
+        # Ключ = число вариантов + случайная добавка в [0, 1), которая разбивает равенства;
+        # у уже выбранных уроков ключ inf и вычитания его не меняют
+        selection_keys = self.initial_candidate_counts + ant.rng.random(num_lessons)
+        closed_slots = self._initial_closed_slots()
+        for _ in range(num_lessons):
+            lesson_idx = int(np.argmin(selection_keys))
+            selection_keys[lesson_idx] = np.inf
+            yield lesson_idx
+            slot_idx = int(ant.slot_of[lesson_idx])
+            if slot_idx < 0: continue
+            room_idx, group_idx = int(ant.room_of[lesson_idx]), int(self.lesson_group_ids[lesson_idx])
+            # Уроки той же группы теряют все варианты в этом слоте
+            group_lessons = self.group_lesson_ids[group_idx]
+            free_rooms_before = ~ant.room_busy[:, slot_idx]
+            free_rooms_before[room_idx] = True
+            selection_keys[group_lessons] -= (self.lesson_room_mask[group_lessons] & free_rooms_before).sum(axis=1)
+            if closed_slots is not None:
+                # ...и, если день группы заполнен, варианты в остальных ее свободных слотах этого дня
+                closed_now = self._close_full_day_slots(ant, group_idx, slot_idx, closed_slots)
+                selection_keys[group_lessons] -= self.lesson_room_mask[group_lessons] @ (~ant.room_busy[:, closed_now]).sum(axis=1)
+            # Уроки других групп, свободных в этом слоте, теряют занятую аудиторию
+            affected = self.lesson_room_mask[:, room_idx] & ~ant.group_busy[self.lesson_group_ids, slot_idx] \
+                       & self.group_slot_mask[self.lesson_group_ids, slot_idx]
+            if closed_slots is not None: affected &= ~closed_slots[self.lesson_group_ids, slot_idx]
+            selection_keys[affected] -= 1
+
+    def _iter_most_constrained_slot_lessons(self, ant: Ant, phase_slot_of: np.ndarray):
+        # 'most_constrained' для первого этапа 'slot_then_room': урок занимает слот, но не аудиторию, поэтому
+        # вариант урока - свободный слот группы, а его вес - min(подходящих аудиторий урока, свободных мест в слоте)
+        num_lessons = len(self.lesson_items)
+        slot_supply = np.full(len(self.slot_names), len(self.room_catalogue), dtype=np.int64)
+        selection_keys = self.initial_candidate_counts + ant.rng.random(num_lessons)
+        closed_slots = self._initial_closed_slots()
+        for _ in range(num_lessons):
+            lesson_idx = int(np.argmin(selection_keys))
+            selection_keys[lesson_idx] = np.inf
+            yield lesson_idx
+            slot_idx = int(phase_slot_of[lesson_idx])
+            if slot_idx < 0: continue
+            group_idx = int(self.lesson_group_ids[lesson_idx])
+            supply_before = slot_supply[slot_idx]
+            # Уроки той же группы теряют этот слот целиком
+            group_lessons = self.group_lesson_ids[group_idx]
+            selection_keys[group_lessons] -= np.minimum(self.lesson_room_counts[group_lessons], supply_before)
+            if closed_slots is not None:
+                # ...и остальные свободные слоты дня, если он заполнен
+                closed_now = self._close_full_day_slots(ant, group_idx, slot_idx, closed_slots)
+                selection_keys[group_lessons] -= np.minimum(self.lesson_room_counts[group_lessons][:, None],
+                                                            slot_supply[closed_now][None, :]).sum(axis=1)
+            if supply_before == 0: continue  # Слот уже переполнен: лишние уроки уйдут на вставку после паросочетания
+            slot_supply[slot_idx] -= 1
+            # У уроков других групп, свободных в этом слоте, вес слота падает, если его ограничивал остаток мест
+            affected = (self.lesson_room_counts >= supply_before) & ~ant.group_busy[self.lesson_group_ids, slot_idx] \
+                       & self.group_slot_mask[self.lesson_group_ids, slot_idx]
+            if closed_slots is not None: affected &= ~closed_slots[self.lesson_group_ids, slot_idx]
+            selection_keys[affected] -= 1
+
+    @staticmethod
+    def _roulette_choice(ant: Ant, prob_scores: np.ndarray) -> int:
+        cumulative_scores = np.cumsum(prob_scores)
+        total_prob_score = cumulative_scores[-1]
+        if total_prob_score > 0:
+            chosen_pos = int(np.searchsorted(cumulative_scores, ant.rng.random() * total_prob_score, side='right'))
+            return min(chosen_pos, prob_scores.size - 1)
+        return int(ant.rng.integers(prob_scores.size))
+
+    def _rebuild_candidate_lists(self):
+        # ACS: для каждой пары (группа, предмет) k лучших клеток (слот, аудитория) по феромону и статической
+        # эвристике. Клетки, недопустимые для пары (нет феромона или аудитория не подходит), получают вес 0.
+        num_keys, num_slots, num_rooms = self.pheromone_matrix.shape
+        list_size = min(self.candidate_list_size, num_slots * num_rooms)
+        key_lesson_ids = np.zeros(num_keys, dtype=np.int32)
+        key_lesson_ids[self.lesson_key_ids] = np.arange(len(self.lesson_items), dtype=np.int32)
+        room_eta = (self.signature_room_eta_beta[self.lesson_signature_ids[key_lesson_ids]]
+                    * self.lesson_room_mask[key_lesson_ids])
+        static_eta = self.slot_scarcity_eta_beta[None, :, None] * room_eta[:, None, :]
+        scores = (np.power(self.pheromone_matrix, self.alpha) * static_eta).reshape(num_keys, -1)
+        top_ids = np.argpartition(-scores, list_size - 1, axis=1)[:, :list_size]
+        self.candidate_slots, self.candidate_rooms = np.divmod(top_ids, num_rooms)
+        # В весах кандидатов - только аудиторная часть: дефицит слота вместе с близостью к парам группы
+        # добавляет _slot_eta_beta_for_bits при выборе, как и при полном переборе
+        self._candidate_room_eta = np.take_along_axis(room_eta, self.candidate_rooms, axis=1)
+
+    def _refresh_candidate_scores(self):
+        # Веса кандидатов по текущему феромону (раз в итерацию, списки при этом не меняются)
+        key_ids = np.arange(self.pheromone_matrix.shape[0])[:, None]
+        self.candidate_scores = (np.power(self.pheromone_matrix[key_ids, self.candidate_slots, self.candidate_rooms], self.alpha)
+                                 * self._candidate_room_eta)
+
+    def _candidate_list_choice(self, ant: Ant, lesson_idx: int, group_idx: int) -> (tuple | None):
+        # Выбор из списка кандидатов пары; None - все k клеток заняты или недопустимы (нужен полный перебор)
+        key_idx = self.lesson_key_ids[lesson_idx]
+        slot_ids, room_ids = self.candidate_slots[key_idx], self.candidate_rooms[key_idx]
+        prob_scores = self.candidate_scores[key_idx] * (self._group_free_slots(ant, group_idx)[slot_ids] & ~ant.room_busy[room_ids, slot_ids])
+        free_pos = np.flatnonzero(prob_scores)
+        if free_pos.size == 0: return None
+        prob_scores = prob_scores[free_pos] * self._slot_eta_beta_for_bits(ant.group_slot_bits[group_idx])[slot_ids[free_pos]]
+        chosen_pos = free_pos[self._roulette_choice(ant, prob_scores)]
+        return int(slot_ids[chosen_pos]), int(room_ids[chosen_pos])
+
     def _construct_schedule_for_ant(self, ant: Ant):
-        all_lessons_to_place_flat = []
-        for group, lessons_list in ant.lessons_to_schedule.items():
-            for lesson_info in lessons_list: all_lessons_to_place_flat.append((group, lesson_info))
-        random.shuffle(all_lessons_to_place_flat)
-        for group_name, lesson_info in all_lessons_to_place_flat:
-            lesson_name_str = lesson_info['name']
-            possible_time_room_choices = []
-            override_room_name = self._get_target_room_for_special_override(lesson_name_str)
-            target_room_info_from_override = None
-            if override_room_name:
-                for r_info in ant.group_available_rooms.get(group_name, []):
-                    if r_info['name'] == override_room_name:
-                        target_room_info_from_override = r_info;
-                        break
-                if not target_room_info_from_override:
-                    ant.constraints_violated += 100;
+        if self.assignment_mode == 'slot_then_room': return self._construct_slots_then_match_rooms(ant)
+        num_rooms = len(self.room_catalogue)
+        for lesson_idx in self._iter_lessons_for_ant(ant):
+            if self.lesson_override_missing[lesson_idx]:
+                ant.constraints_violated += 100;
+                continue
+            group_idx = self.lesson_group_ids[lesson_idx]
+            if self.candidate_slots is not None:
+                chosen_cell = self._candidate_list_choice(ant, lesson_idx, group_idx)
+                if chosen_cell is not None:
+                    self._place_lesson(ant, lesson_idx, *chosen_cell);
                     continue
-            available_times = ant.group_available_times.get(group_name, [])
-            available_rooms = ant.group_available_rooms.get(group_name, [])
-            pheromone_key_for_lesson = (group_name, lesson_name_str)
-            pheromone_values_for_lesson = self.pheromone_matrix.get(pheromone_key_for_lesson, {})
-            for time_slot_option in available_times:
-                rooms_to_consider_for_time = [
-                    target_room_info_from_override] if target_room_info_from_override else available_rooms
-                for room_info_option in rooms_to_consider_for_time:
-                    if self._is_placement_valid(ant.schedule, group_name, time_slot_option, room_info_option,
-                                                lesson_info):
-                        pheromone_val = pheromone_values_for_lesson.get((time_slot_option, room_info_option['name']),
-                                                                        1.0)
-                        heuristic_val = 1.0
-                        prob_score = (pheromone_val ** self.alpha) * (heuristic_val ** self.beta)
-                        possible_time_room_choices.append(((time_slot_option, room_info_option), prob_score))
-            if not possible_time_room_choices:
+            candidate_ids = np.flatnonzero(
+                self._get_free_candidates_mask(ant, group_idx, self.lesson_room_mask[lesson_idx]))
+            if candidate_ids.size == 0:
                 ant.constraints_violated += 10;
                 continue
-            total_prob_score = sum(score for _, score in possible_time_room_choices)
-            chosen_time_slot, chosen_room_info = None, None
-            if total_prob_score == 0:
-                if possible_time_room_choices:
-                    chosen_time_slot, chosen_room_info = \
-                    random.choice([item for item, score in possible_time_room_choices])[0]
-                else:
-                    ant.constraints_violated += 10; continue
+            pheromone_values_for_lesson = self.pheromone_matrix[self.lesson_key_ids[lesson_idx]]
+            heuristic_values = np.multiply.outer(self._slot_eta_beta_for_bits(ant.group_slot_bits[group_idx]),
+                                                 self.signature_room_eta_beta[self.lesson_signature_ids[lesson_idx]])
+            prob_scores = (np.power(pheromone_values_for_lesson.ravel()[candidate_ids], self.alpha)
+                           * heuristic_values.ravel()[candidate_ids])
+            chosen_pos = self._roulette_choice(ant, prob_scores)
+            chosen_slot_idx, chosen_room_idx = divmod(int(candidate_ids[chosen_pos]), num_rooms)
+            self._place_lesson(ant, lesson_idx, chosen_slot_idx, chosen_room_idx)
+
+    def _slot_scores(self, ant: Ant, lesson_idx: int, group_idx: int) -> np.ndarray:
+        # Вес слота для урока: феромон, просуммированный по аудиториям, и слотовая часть эвристики
+        slot_pheromone = self.pheromone_matrix[self.lesson_key_ids[lesson_idx]].sum(axis=1)
+        return np.power(slot_pheromone, self.alpha) * self._slot_eta_beta_for_bits(ant.group_slot_bits[group_idx])
+
+    def _construct_slots_then_match_rooms(self, ant: Ant):
+        # 1) муравей выбирает только слоты; 2) в каждом слоте аудитории назначаются максимальным
+        # паросочетанием (Hopcroft-Karp) по совместимости; 3) уроки без аудитории пробуют другие свободные
+        # слоты группы через увеличивающий путь. Урок остается неразмещенным, только если ни в одном
+        # свободном слоте группы нет допустимого назначения аудиторий.
+        num_slots, num_rooms = len(self.slot_names), len(self.room_catalogue)
+        slot_lessons = [[] for _ in range(num_slots)]
+        phase_slot_of = np.full(len(self.lesson_items), -1, dtype=np.int32)
+        for lesson_idx in self._iter_lessons_for_ant(ant, phase_slot_of):
+            if self.lesson_override_missing[lesson_idx]:
+                ant.constraints_violated += 100;
+                continue
+            group_idx = int(self.lesson_group_ids[lesson_idx])
+            candidate_slots = np.flatnonzero(self._group_free_slots(ant, group_idx))
+            if candidate_slots.size == 0 or not self.lesson_room_lists[lesson_idx]:
+                ant.constraints_violated += 10;
+                continue
+            chosen_slot_idx = int(candidate_slots[self._roulette_choice(
+                ant, self._slot_scores(ant, lesson_idx, group_idx)[candidate_slots])])
+            slot_lessons[chosen_slot_idx].append(lesson_idx)
+            phase_slot_of[lesson_idx] = chosen_slot_idx
+            ant.group_busy[group_idx, chosen_slot_idx] = True  # Слот группы занят до назначения аудиторий
+            ant.group_slot_bits[group_idx] |= 1 << chosen_slot_idx
+        slot_matchings = []
+        unmatched_lessons = []
+        for slot_idx in range(num_slots):
+            adjacency = [self.lesson_room_lists[lesson_idx] for lesson_idx in slot_lessons[slot_idx]]
+            match_left, match_right = hopcroft_karp(adjacency, num_rooms)
+            matched = [pos for pos, room_idx in enumerate(match_left) if room_idx >= 0]
+            for pos, lesson_idx in enumerate(slot_lessons[slot_idx]):
+                if match_left[pos] < 0:
+                    group_idx = int(self.lesson_group_ids[lesson_idx])
+                    ant.group_busy[group_idx, slot_idx] = False
+                    ant.group_slot_bits[group_idx] &= ~(1 << slot_idx)
+                    unmatched_lessons.append(lesson_idx)
+            slot_lessons[slot_idx] = [slot_lessons[slot_idx][pos] for pos in matched]
+            match_left = [match_left[pos] for pos in matched]
+            match_right = [-1] * num_rooms
+            for pos, room_idx in enumerate(match_left): match_right[room_idx] = pos
+            slot_matchings.append((match_left, match_right))
+        # Размещение после снятия всех несопоставленных уроков, чтобы штрафы групп считались по итоговым маскам
+        for slot_idx, (match_left, _) in enumerate(slot_matchings):
+            for lesson_idx, room_idx in zip(slot_lessons[slot_idx], match_left):
+                self._place_lesson(ant, lesson_idx, slot_idx, room_idx)
+        # Если урок с таким списком аудиторий не встал в слот, не встанет и позже: паросочетания слотов только растут
+        failed_insertions = set()
+        for lesson_idx in unmatched_lessons:
+            group_idx = int(self.lesson_group_ids[lesson_idx])
+            room_list_id = self.lesson_room_list_ids[lesson_idx]
+            candidate_slots = np.flatnonzero(self._group_free_slots(ant, group_idx))
+            slot_scores = self._slot_scores(ant, lesson_idx, group_idx)[candidate_slots]
+            for slot_idx in candidate_slots[np.argsort(-slot_scores, kind='stable')].tolist():
+                if len(slot_lessons[slot_idx]) >= num_rooms or (slot_idx, room_list_id) in failed_insertions: continue
+                if self._insert_into_slot_matching(ant, lesson_idx, slot_idx, slot_lessons[slot_idx], *slot_matchings[slot_idx]):
+                    break
+                failed_insertions.add((slot_idx, room_list_id))
             else:
-                rand_val = random.uniform(0, total_prob_score)
-                current_sum = 0
-                for (time_r_pair, score) in possible_time_room_choices:
-                    current_sum += score
-                    if current_sum >= rand_val: chosen_time_slot, chosen_room_info = time_r_pair; break
-                if chosen_time_slot is None and possible_time_room_choices:
-                    chosen_time_slot, chosen_room_info = possible_time_room_choices[-1][0]
-                elif chosen_time_slot is None:
-                    ant.constraints_violated += 10; continue
-            ant.add_lesson_to_schedule(chosen_time_slot, group_name, lesson_info, chosen_room_info)
-
-    def _get_time_slot_index(self, time_slot: str, all_day_slots_sorted: list) -> int:
-        try:
-            return all_day_slots_sorted.index(time_slot)
-        except ValueError:
-            return -1
+                ant.constraints_violated += 10
 
-    def _evaluate_schedule(self, schedule: dict, constraints_violated_penalty: int) -> float:
-        fitness = float(constraints_violated_penalty)
-        total_lessons_to_place = sum(len(l_list) for l_list in self.lessons_for_day_by_group.values())
-        placed_lessons_count = sum(len(items_in_slot) for items_in_slot in schedule.values())
-        unplaced_lessons = total_lessons_to_place - placed_lessons_count
-        fitness += unplaced_lessons * self.penalty_unplaced_lesson
+    def _insert_into_slot_matching(self, ant: Ant, lesson_idx: int, slot_idx: int, lessons_in_slot: list,
+                                   match_left: list, match_right: list) -> bool:
+        # Добавляет урок в паросочетание слота; аудитории уроков на увеличивающем пути переназначаются
+        adjacency = [self.lesson_room_lists[idx] for idx in lessons_in_slot] + [self.lesson_room_lists[lesson_idx]]
+        match_left.append(-1)
+        if not augment_from(adjacency, match_left, match_right, len(lessons_in_slot)):
+            match_left.pop()
+            return False
+        lessons_in_slot.append(lesson_idx)
+        for other_lesson_idx, room_idx in zip(lessons_in_slot[:-1], match_left):
+            previous_room_idx = int(ant.room_of[other_lesson_idx])
+            if previous_room_idx != room_idx:  # Аудитория меняется внутри слота - штрафы группы не меняются
+                ant.room_busy[previous_room_idx, slot_idx] = False
+                ant.room_of[other_lesson_idx] = room_idx
+        for other_lesson_idx, room_idx in zip(lessons_in_slot[:-1], match_left):
+            ant.room_busy[room_idx, slot_idx] = True
+        self._place_lesson(ant, lesson_idx, slot_idx, match_left[-1])
+        return True
 
-        unique_day_time_slots_set = set()
-        for group_slots in self.group_available_times_on_day.values():
-            unique_day_time_slots_set.update(group_slots)
-        all_day_slots_sorted = sorted(list(unique_day_time_slots_set))
+    def _place_lesson(self, ant: Ant, lesson_idx: int, slot_idx: int, room_idx: int):
+        group_idx = int(self.lesson_group_ids[lesson_idx])
+        ant.add_lesson_to_schedule(lesson_idx, group_idx, slot_idx, room_idx)
+        new_group_penalty = self._group_penalty_for_bits(ant.group_slot_bits[group_idx])
+        ant.soft_penalty += new_group_penalty - ant.group_penalties[group_idx]
+        ant.group_penalties[group_idx] = new_group_penalty
 
-        for group_name in self.lessons_for_day_by_group.keys():
-            group_lessons_indices = []
-            for time_slot, lessons_at_time in schedule.items():
-                for lesson_item in lessons_at_time:
-                    if lesson_item['group'] == group_name:
-                        slot_idx = self._get_time_slot_index(time_slot, all_day_slots_sorted)
-                        if slot_idx != -1: group_lessons_indices.append(slot_idx)
-            if not group_lessons_indices: continue
-            group_lessons_indices.sort()
-
-            window_penalty = 0
-            consecutive_lessons_count = 0
-            max_consecutive_run = 0
-
-            if group_lessons_indices:  # Если у группы вообще есть пары
-                consecutive_lessons_count = 1  # Начинаем с первой пары
-                max_consecutive_run = 1
-                for i in range(len(group_lessons_indices) - 1):
-                    diff = group_lessons_indices[i + 1] - group_lessons_indices[i]
-                    if diff > 1:  # Окно
-                        window_penalty += (diff - 1) * self.penalty_window_slot
-                        if consecutive_lessons_count > self.max_consecutive_lessons_for_group:
-                            fitness += (
-                                                   consecutive_lessons_count - self.max_consecutive_lessons_for_group) * self.penalty_consecutive_lessons
-                        consecutive_lessons_count = 1  # Сбрасываем счетчик пар подряд
-                    else:  # diff == 1, пары подряд
-                        consecutive_lessons_count += 1
-                    max_consecutive_run = max(max_consecutive_run, consecutive_lessons_count)
-
-                # Проверяем последнюю серию пар подряд
-                if consecutive_lessons_count > self.max_consecutive_lessons_for_group:
-                    fitness += (
-                                           consecutive_lessons_count - self.max_consecutive_lessons_for_group) * self.penalty_consecutive_lessons
-
-            fitness += window_penalty
+    def _unplace_lesson(self, ant: Ant, lesson_idx: int):
+        group_idx = int(self.lesson_group_ids[lesson_idx])
+        ant.remove_lesson_from_schedule(lesson_idx, group_idx)
+        new_group_penalty = self._group_penalty_for_bits(ant.group_slot_bits[group_idx])
+        ant.soft_penalty += new_group_penalty - ant.group_penalties[group_idx]
+        ant.group_penalties[group_idx] = new_group_penalty
+
+    def _ant_from_assignment(self, slot_of: np.ndarray, room_of: np.ndarray, rng: np.random.Generator) -> Ant:
+        # Восстанавливает счетчики муравья по назначению. При построении каждый неразмещенный урок
+        # получает штраф 100 (нет спец. аудитории) или 10 (нет вариантов), поэтому штраф однозначен.
+        ant = Ant(num_lessons=len(self.lesson_items), num_groups=len(self.group_names),
+                  num_slots=len(self.slot_names), num_rooms=len(self.room_catalogue), rng=rng)
+        for lesson_idx in range(len(self.lesson_items)):
+            if slot_of[lesson_idx] >= 0: self._place_lesson(ant, lesson_idx, int(slot_of[lesson_idx]), int(room_of[lesson_idx]))
+            else: ant.constraints_violated += 100 if self.lesson_override_missing[lesson_idx] else 10
+        ant.fitness = self._evaluate_ant(ant)
+        return ant
+
+    def _sample_local_move(self, ant: Ant, lesson_idx: int) -> (tuple | None):
+        # Случайный допустимый ход для урока: (дельта фитнеса, вид, урок, слот, аудитория, второй урок).
+        # Виды: 'move' - перенос/вставка урока в свободную клетку, 'swap' - обмен уроков местами,
+        # 'room_swap' - обмен аудиториями двух уроков в одном слоте.
+        if self.lesson_override_missing[lesson_idx]: return None
+        group_idx = int(self.lesson_group_ids[lesson_idx])
+        current_slot_idx = int(ant.slot_of[lesson_idx])
+        move_kind = 'move' if current_slot_idx < 0 else ('move', 'swap', 'room_swap')[int(ant.rng.integers(3))]
+        if move_kind == 'move':
+            candidate_ids = np.flatnonzero(self._get_free_candidates_mask(ant, group_idx, self.lesson_room_mask[lesson_idx]))
+            if current_slot_idx >= 0:  # Свой слот группа занимает сама - можно сменить аудиторию
+                same_slot_rooms = np.flatnonzero(self.lesson_room_mask[lesson_idx] & ~ant.room_busy[:, current_slot_idx])
+                candidate_ids = np.concatenate((candidate_ids, current_slot_idx * len(self.room_catalogue) + same_slot_rooms))
+            if candidate_ids.size == 0: return None
+            target_slot_idx, target_room_idx = divmod(int(candidate_ids[int(ant.rng.integers(candidate_ids.size))]),
+                                                      len(self.room_catalogue))
+            if current_slot_idx < 0:  # Вставка: уходит и штраф 10 за неразмещенный урок
+                delta = self._move_fitness_delta(ant, group_idx, to_slot_idx=target_slot_idx) - 10
+            elif target_slot_idx == current_slot_idx: delta = 0.0
+            else: delta = self._move_fitness_delta(ant, group_idx, current_slot_idx, target_slot_idx)
+            return delta, move_kind, lesson_idx, target_slot_idx, target_room_idx, -1
+        placed_lessons = np.flatnonzero(ant.slot_of >= 0) if move_kind == 'swap' else np.flatnonzero(ant.slot_of == current_slot_idx)
+        other_lesson_idx = int(placed_lessons[int(ant.rng.integers(placed_lessons.size))])
+        other_group_idx = int(self.lesson_group_ids[other_lesson_idx])
+        other_slot_idx, other_room_idx = int(ant.slot_of[other_lesson_idx]), int(ant.room_of[other_lesson_idx])
+        current_room_idx = int(ant.room_of[lesson_idx])
+        if other_group_idx == group_idx or not (self.lesson_room_mask[lesson_idx, other_room_idx]
+                                                and self.lesson_room_mask[other_lesson_idx, current_room_idx]): return None
+        if move_kind == 'room_swap': return 0.0, move_kind, lesson_idx, current_slot_idx, other_room_idx, other_lesson_idx
+        if other_slot_idx == current_slot_idx: return None
+        if not (self.group_slot_mask[group_idx, other_slot_idx] and not ant.group_busy[group_idx, other_slot_idx]
+                and self.group_slot_mask[other_group_idx, current_slot_idx] and not ant.group_busy[other_group_idx, current_slot_idx]):
+            return None
+        if self.day_lesson_limits is not None and (
+                self._full_day_slots_for_bits(ant.group_slot_bits[group_idx] & ~(1 << current_slot_idx))[other_slot_idx]
+                or self._full_day_slots_for_bits(ant.group_slot_bits[other_group_idx] & ~(1 << other_slot_idx))[current_slot_idx]):
+            return None
+        delta = (self._move_fitness_delta(ant, group_idx, current_slot_idx, other_slot_idx)
+                 + self._move_fitness_delta(ant, other_group_idx, other_slot_idx, current_slot_idx))
+        return delta, move_kind, lesson_idx, other_slot_idx, other_room_idx, other_lesson_idx
+
+    def _apply_local_move(self, ant: Ant, move: tuple):
+        delta, move_kind, lesson_idx, target_slot_idx, target_room_idx, other_lesson_idx = move
+        if move_kind == 'move':
+            if ant.slot_of[lesson_idx] < 0: ant.constraints_violated -= 10
+            else: self._unplace_lesson(ant, lesson_idx)
+            self._place_lesson(ant, lesson_idx, target_slot_idx, target_room_idx)
+        else:
+            current_slot_idx, current_room_idx = int(ant.slot_of[lesson_idx]), int(ant.room_of[lesson_idx])
+            self._unplace_lesson(ant, lesson_idx)
+            self._unplace_lesson(ant, other_lesson_idx)
+            self._place_lesson(ant, lesson_idx, target_slot_idx, target_room_idx)
+            self._place_lesson(ant, other_lesson_idx, current_slot_idx, current_room_idx)
+        ant.fitness += delta
 
+    def _run_local_search(self):
+        # Доводка лучшего решения ACO: на каждом шаге рассматривается выборка случайных ходов
+        # (чаще для уроков групп со штрафом и неразмещенных), фитнес считается по дельтам.
+        # hill_climbing принимает лучший неухудшающий ход, tabu - лучший не запрещенный ход.
+        start_time = time.perf_counter()
+        deadline = start_time + self.local_search_time_limit
+        ant = self._ant_from_assignment(*self._best_assignment, rng=np.random.default_rng(self._seed_sequence.spawn(1)[0]))
+        best_fitness = ant.fitness
+        tabu_until = {}  # (урок, слот) -> шаг, до которого урок нельзя вернуть в этот слот
+        all_lessons = np.flatnonzero(~self.lesson_override_missing)
+        if all_lessons.size == 0: return
+        steps_done = 0
+        for step in range(self.local_search_max_steps):
+            if best_fitness <= self.fitness_lower_bound + 1e-9 or time.perf_counter() >= deadline: break
+            steps_done = step + 1
+            problem_lessons = all_lessons[(ant.slot_of[all_lessons] < 0)
+                                          | (np.asarray(ant.group_penalties)[self.lesson_group_ids[all_lessons]] > 0)]
+            chosen_move = None
+            for _ in range(self.local_search_sample_size):
+                lesson_pool = problem_lessons if problem_lessons.size and ant.rng.random() < 0.7 else all_lessons
+                move = self._sample_local_move(ant, int(lesson_pool[int(ant.rng.integers(lesson_pool.size))]))
+                if move is None: continue
+                if self.local_search_mode == 'tabu' and tabu_until.get((move[2], move[3]), -1) > step \
+                        and ant.fitness + move[0] >= best_fitness - 1e-9: continue  # Критерий стремления
+                if chosen_move is None or move[0] < chosen_move[0]: chosen_move = move
+            if chosen_move is None: continue
+            if self.local_search_mode != 'tabu' and chosen_move[0] > 1e-9: continue
+            left_slot_idx = int(ant.slot_of[chosen_move[2]])
+            self._apply_local_move(ant, chosen_move)
+            if self.local_search_mode == 'tabu' and left_slot_idx >= 0:
+                tabu_until[(chosen_move[2], left_slot_idx)] = step + self.tabu_tenure
+            if ant.fitness < best_fitness - 1e-9:
+                best_fitness = ant.fitness
+                self._best_assignment = (ant.slot_of.copy(), ant.room_of.copy())
+        logger.debug(f"ACO Daily: локальный поиск ({self.local_search_mode}) {steps_done} шагов за "
+                     f"{time.perf_counter() - start_time:.3f} с, фитнес {self.best_fitness_for_day:.2f} -> {best_fitness:.2f}")
+        self.best_fitness_for_day = min(self.best_fitness_for_day, best_fitness)
+
+    def _group_penalty(self, group_lessons_indices: tuple) -> float:
+        # Штраф группы за окна, длинные серии пар подряд и превышение мягкого лимита пар.
+        # group_lessons_indices - отсортированные индексы слотов, занятых группой; для multi_day штраф считается по дням.
+        penalty = self._group_penalty_cache.get(group_lessons_indices)
+        if penalty is not None: return penalty
+        if self.multi_day:
+            penalty = self._group_penalty_for_bits(sum(1 << slot_idx for slot_idx in group_lessons_indices))
+        else:
+            penalty = self._day_block_penalty(group_lessons_indices)
+        self._group_penalty_cache[group_lessons_indices] = penalty
+        return penalty
+
+    def _day_block_penalty(self, group_lessons_indices: tuple) -> float:
+        penalty = 0.0
+        if group_lessons_indices:
+            consecutive_lessons_count = 1
+            for i in range(len(group_lessons_indices) - 1):
+                diff = group_lessons_indices[i + 1] - group_lessons_indices[i]
+                if diff > 1:  # Окно
+                    penalty += (diff - 1) * self.penalty_window_slot
+                    if consecutive_lessons_count > self.max_consecutive_lessons_for_group:
+                        penalty += (consecutive_lessons_count - self.max_consecutive_lessons_for_group) * self.penalty_consecutive_lessons
+                    consecutive_lessons_count = 1
+                else:  # Пары подряд
+                    consecutive_lessons_count += 1
+            if consecutive_lessons_count > self.max_consecutive_lessons_for_group:
+                penalty += (consecutive_lessons_count - self.max_consecutive_lessons_for_group) * self.penalty_consecutive_lessons
             if len(group_lessons_indices) > self.soft_limit_max_lessons_group:
-                fitness += (
-                                       len(group_lessons_indices) - self.soft_limit_max_lessons_group) * self.penalty_max_lessons_group_soft_coeff
+                penalty += (len(group_lessons_indices) - self.soft_limit_max_lessons_group) * self.penalty_max_lessons_group_soft_coeff
+        return penalty
+
+    def _group_penalty_for_bits(self, slot_bits: int) -> float:
+        if self.multi_day:
+            # Сумма штрафов по дням; штраф дня запоминается по маске дня
+            penalty = 0.0
+            for _, first_slot_idx, block_mask in self.day_slot_blocks:
+                block_bits = slot_bits >> first_slot_idx & block_mask
+                if block_bits: penalty += self._day_penalty_for_bits(block_bits)
+            return penalty
+        penalty = self._group_penalty_bits_cache.get(slot_bits)
+        if penalty is None:
+            penalty = self._group_penalty(tuple(idx for idx in range(len(self.slot_names)) if slot_bits >> idx & 1))
+            self._group_penalty_bits_cache[slot_bits] = penalty
+        return penalty
+
+    def _day_penalty_for_bits(self, block_bits: int) -> float:
+        # Штраф зависит только от взаимного расположения пар внутри дня, поэтому маска дня - ключ, общий для всех дней
+        penalty = self._group_penalty_bits_cache.get(block_bits)
+        if penalty is None:
+            penalty = self._day_block_penalty(tuple(idx for idx in range(block_bits.bit_length()) if block_bits >> idx & 1))
+            self._group_penalty_bits_cache[block_bits] = penalty
+        return penalty
+
+    def _utilization_penalty(self, placed_lessons_count: int) -> float:
+        return utilization_penalty(placed_lessons_count, self.total_possible_placements, self.slot_utilization_threshold,
+                                   self.penalty_slot_underutilization_coeff)
 
-        total_possible_placements = sum(len(times) for times in self.group_available_times_on_day.values())
-        utilization_ratio = placed_lessons_count / total_possible_placements if total_possible_placements > 0 else 1.0
-        if utilization_ratio < self.slot_utilization_threshold:
-            fitness += (1.0 - utilization_ratio) * self.penalty_slot_underutilization_coeff
+    def _evaluate_ant(self, ant: Ant) -> float:
+        # Фитнес по счетчикам муравья; совпадает с _evaluate_schedule для его расписания
+        unplaced_lessons = self.total_lessons_to_place - ant.placed_count
+        return (float(ant.constraints_violated) + unplaced_lessons * self.penalty_unplaced_lesson + ant.soft_penalty
+                + self._utilization_penalty(ant.placed_count))
 
+    def _move_fitness_delta(self, ant: Ant, group_idx: int, from_slot_idx: int | None = None,
+                            to_slot_idx: int | None = None) -> float:
+        # Изменение фитнеса, если пара группы уйдет из from_slot_idx и/или встанет в to_slot_idx
+        # (None - снятие или добавление пары). Состояние муравья не меняется.
+        old_bits = ant.group_slot_bits[group_idx]
+        new_bits = old_bits
+        placed_change = 0
+        if from_slot_idx is not None: new_bits &= ~(1 << from_slot_idx); placed_change -= 1
+        if to_slot_idx is not None: new_bits |= 1 << to_slot_idx; placed_change += 1
+        delta = self._group_penalty_for_bits(new_bits) - ant.group_penalties[group_idx]
+        if placed_change:
+            delta += (-placed_change * self.penalty_unplaced_lesson
+                      + self._utilization_penalty(ant.placed_count + placed_change)
+                      - self._utilization_penalty(ant.placed_count))
+        return delta
+
+    def _evaluate_schedule(self, schedule: dict, constraints_violated_penalty: int) -> float:
+        # Полная оценка расписания в виде словаря {слот: [элементы]}; используется для внешних расписаний
+        placed_lessons_count = sum(len(items_in_slot) for items_in_slot in schedule.values())
+        unplaced_lessons = self.total_lessons_to_place - placed_lessons_count
+        fitness = float(constraints_violated_penalty) + unplaced_lessons * self.penalty_unplaced_lesson
+        group_lessons_indices = {}
+        for time_slot, lessons_at_time in schedule.items():
+            slot_idx = self.slot_index.get(time_slot)
+            if slot_idx is None: continue
+            for lesson_item in lessons_at_time:
+                group_lessons_indices.setdefault(lesson_item['group'], []).append(slot_idx)
+        for group_name in self.lessons_for_day_by_group.keys():
+            if group_name in group_lessons_indices:
+                fitness += self._group_penalty(tuple(sorted(group_lessons_indices[group_name])))
+        fitness += self._utilization_penalty(placed_lessons_count)
         for time_slot, scheduled_items_at_time in schedule.items():
             groups_at_time = set();
             rooms_at_time = set()
@@ -260,18 +960,123 @@ class Scheduler:
                 rooms_at_time.add(item['room']['name'])
         return fitness
 
+    def _batched_slot_eta_beta(self, group_slot_bits: np.ndarray) -> np.ndarray:
+        # Слотовая эвристика [муравей, слот] по маскам занятых слотов групп; строки берутся по уникальным маскам
+        # из того же кэша, что и у обычного муравья, вместо таблицы на все 2**S масок
+        unique_bits, inverse = np.unique(group_slot_bits, return_inverse=True)
+        unique_rows = np.stack([self._slot_eta_beta_for_bits(int(bits)) for bits in unique_bits])
+        return unique_rows[inverse.reshape(-1)]
+
+    def _run_batched_iteration(self):
+        # Все муравьи итерации строят расписания синхронно: на шаге t каждый муравей ставит свой t-й урок.
+        # Занятость - тензоры [муравей, группа, слот] и [муравей, аудитория, слот], выбор - векторная рулетка.
+        num_ants, num_lessons = self.num_ants, len(self.lesson_items)
+        num_groups, num_slots, num_rooms = len(self.group_names), len(self.slot_names), len(self.room_catalogue)
+        rng = np.random.default_rng(self._seed_sequence.spawn(1)[0])
+        if self.lesson_ordering == 'priority':
+            lesson_orders = np.argsort(-np.log(rng.random((num_ants, num_lessons))) / self.lesson_priority_weights, axis=1, kind='stable')
+        else:
+            lesson_orders = np.argsort(rng.random((num_ants, num_lessons)), axis=1)
+        group_busy = np.zeros((num_ants, num_groups, num_slots), dtype=bool)
+        room_busy = np.zeros((num_ants, num_slots, num_rooms), dtype=bool)
+        group_slot_bits = np.zeros((num_ants, num_groups), dtype=np.int64)
+        slot_of = np.full((num_ants, num_lessons), -1, dtype=np.int32)
+        room_of = np.full((num_ants, num_lessons), -1, dtype=np.int32)
+        constraints_violated = np.zeros(num_ants)
+        pheromone_alpha = np.power(self.pheromone_matrix, self.alpha).reshape(len(self.lesson_keys), -1)
+        ant_ids = np.arange(num_ants)
+        for step in range(num_lessons):
+            lesson_ids = lesson_orders[:, step]
+            override_missing = self.lesson_override_missing[lesson_ids]
+            constraints_violated[override_missing] += 100
+            group_ids = self.lesson_group_ids[lesson_ids]
+            free_slots = self.group_slot_mask[group_ids] & ~group_busy[ant_ids, group_ids]
+            free_cells = (free_slots[:, :, None] & self.lesson_room_mask[lesson_ids][:, None, :] & ~room_busy).reshape(num_ants, -1)
+            free_cells[override_missing] = False
+            heuristic = (self._batched_slot_eta_beta(group_slot_bits[ant_ids, group_ids])[:, :, None]
+                         * self.signature_room_eta_beta[self.lesson_signature_ids[lesson_ids]][:, None, :]).reshape(num_ants, -1)
+            scores = pheromone_alpha[self.lesson_key_ids[lesson_ids]] * heuristic * free_cells
+            has_candidates = free_cells.any(axis=1)
+            constraints_violated[~has_candidates & ~override_missing] += 10
+            zero_scores = has_candidates & ~(scores.sum(axis=1) > 0)
+            scores[zero_scores] = free_cells[zero_scores]  # Как и у обычного муравья: равновероятно среди свободных
+            cumulative_scores = np.cumsum(scores, axis=1)
+            thresholds = rng.random(num_ants) * cumulative_scores[:, -1]
+            chosen_cells = np.minimum((cumulative_scores <= thresholds[:, None]).sum(axis=1), num_slots * num_rooms - 1)
+            placing = np.flatnonzero(has_candidates)
+            chosen_slots, chosen_rooms = np.divmod(chosen_cells[placing], num_rooms)
+            placed_lessons, placed_groups = lesson_ids[placing], group_ids[placing]
+            group_busy[placing, placed_groups, chosen_slots] = True
+            room_busy[placing, chosen_slots, chosen_rooms] = True
+            group_slot_bits[placing, placed_groups] |= np.left_shift(1, chosen_slots).astype(np.int64)
+            slot_of[placing, placed_lessons] = chosen_slots
+            room_of[placing, placed_lessons] = chosen_rooms
+        fitness_values = self._evaluate_batch(slot_of, group_slot_bits, constraints_violated)
+        best_ant_idx = int(np.argmin(fitness_values))
+        if fitness_values[best_ant_idx] < self.best_fitness_for_day:
+            self.best_fitness_for_day = float(fitness_values[best_ant_idx])
+            self._best_assignment = (slot_of[best_ant_idx].copy(), room_of[best_ant_idx].copy())
+        self._evaporate_and_deposit(fitness_values, slot_of, room_of)
+
+    def _evaluate_batch(self, slot_of: np.ndarray, group_slot_bits: np.ndarray, constraints_violated: np.ndarray) -> np.ndarray:
+        # Фитнес всех муравьев сразу; штрафы групп берутся по уникальным маскам из того же кэша, что и у _evaluate_ant
+        placed_counts = (slot_of >= 0).sum(axis=1)
+        unique_bits, inverse = np.unique(group_slot_bits, return_inverse=True)
+        bits_penalties = np.array([self._group_penalty_for_bits(int(bits)) for bits in unique_bits])
+        soft_penalties = bits_penalties[inverse.reshape(group_slot_bits.shape)].sum(axis=1)
+        utilization = placed_counts / self.total_possible_placements if self.total_possible_placements > 0 else np.ones(len(placed_counts))
+        utilization_penalties = np.where(utilization < self.slot_utilization_threshold,
+                                         (1.0 - utilization) * self.penalty_slot_underutilization_coeff, 0.0)
+        return (constraints_violated + (self.total_lessons_to_place - placed_counts) * self.penalty_unplaced_lesson
+                + soft_penalties + utilization_penalties)
+
     def _update_pheromones(self):
-        for pheromone_key, time_room_map in self.pheromone_matrix.items():
-            for time_room_key, value in time_room_map.items():
-                self.pheromone_matrix[pheromone_key][time_room_key] *= (1.0 - self.evaporation_rate)
-        ants_to_deposit = sorted(self.ants, key=lambda ant: ant.fitness)
+        self._evaporate_and_deposit(np.array([ant.fitness for ant in self.ants], dtype=float),
+                                    [ant.slot_of for ant in self.ants], [ant.room_of for ant in self.ants])
+
+    def _evaporate_and_deposit(self, fitness_values: np.ndarray, slot_rows, room_rows):
+        # Испарение и отложение феромона лучшими 10% муравьев; slot_rows/room_rows - назначения муравьев
+        if self.pheromone_update == 'mmas':
+            self._mmas_evaporate_and_deposit(fitness_values, slot_rows, room_rows)
+            return
+        self.pheromone_matrix *= (1.0 - self.evaporation_rate)
         num_best_ants = max(1, int(0.1 * self.num_ants))
-        for ant in ants_to_deposit[:num_best_ants]:
-            if ant.fitness == float('inf'): continue
-            pheromone_add = self.pheromone_deposit_amount / (ant.fitness + 1e-9)
-            for group_name, lesson_info, time_slot, room_info in ant.path:
-                lesson_name_str = lesson_info['name']
-                pheromone_key = (group_name, lesson_name_str)
-                time_room_key = (time_slot, room_info['name'])
-                if pheromone_key in self.pheromone_matrix and time_room_key in self.pheromone_matrix[pheromone_key]:
-                    self.pheromone_matrix[pheromone_key][time_room_key] += pheromone_add
\ No newline at end of file
+        for ant_idx in np.argsort(fitness_values, kind='stable')[:num_best_ants].tolist():
+            self._deposit_pheromone(slot_rows[ant_idx], room_rows[ant_idx], fitness_values[ant_idx])
+
+    def _deposit_pheromone(self, slot_of: np.ndarray, room_of: np.ndarray, fitness: float):
+        placed = slot_of >= 0
+        if fitness == float('inf') or not placed.any(): return
+        np.add.at(self.pheromone_matrix, (self.lesson_key_ids[placed], slot_of[placed], room_of[placed]),
+                  self.pheromone_deposit_amount / (fitness + 1e-9))
+
+    def _mmas_evaporate_and_deposit(self, fitness_values: np.ndarray, slot_rows, room_rows):
+        # MMAS (Stutzle, Hoos): откладывает один муравей, феромон держится в [tau_min, tau_max].
+        # tau_max = Q / (rho * f_best) - предел, к которому сходится след лучшего решения;
+        # tau_min выбран так, чтобы при сходимости лучшее решение строилось с вероятностью p_best.
+        if self._best_assignment is None: return
+        self._update_mmas_bounds()
+        self.pheromone_matrix *= (1.0 - self.evaporation_rate)
+        if self.mmas_deposit_source == 'global_best':
+            self._deposit_pheromone(*self._best_assignment, self.best_fitness_for_day)
+        else:
+            best_ant_idx = int(np.argmin(fitness_values))
+            self._deposit_pheromone(slot_rows[best_ant_idx], room_rows[best_ant_idx], fitness_values[best_ant_idx])
+        self._clamp_pheromones()
+
+    def _update_mmas_bounds(self):
+        tau_max = self.pheromone_deposit_amount / (self.evaporation_rate * (self.best_fitness_for_day + 1e-9))
+        num_decisions = max(1, len(self.lesson_items))
+        p_best_root = self.mmas_p_best ** (1.0 / num_decisions)
+        # Среднее число вариантов на решение: половина допустимых (слот, аудитория), как в оценке из статьи
+        avg_choices = max(2.0, float(self.initial_candidate_counts.mean()) / 2) if self.initial_candidate_counts.size else 2.0
+        tau_min = min(tau_max, tau_max * (1.0 - p_best_root) / ((avg_choices - 1.0) * p_best_root))
+        first_update = self._tau_max is None
+        self._tau_min, self._tau_max = tau_min, tau_max
+        if first_update: self._reset_pheromones_to_max()  # Начальный след MMAS - tau_max
+
+    def _reset_pheromones_to_max(self):
+        np.copyto(self.pheromone_matrix, self._tau_max, where=self._pheromone_available)
+
+    def _clamp_pheromones(self):
+        np.clip(self.pheromone_matrix, self._tau_min, self._tau_max, out=self.pheromone_matrix, where=self._pheromone_available)
@@ -1,11 +1,16 @@
 import random
 import copy
 import logging
+import numpy as np
+from .additional_functions import create_group_workday_times_dict, create_group_rooms_dict
 
 logger = logging.getLogger(__name__)
 
 DAYS_OF_WEEK = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
 WEEKEND_DAYS = ["Суббота", "Воскресенье"]
+WEEKDAYS_ENGINES = ('python', 'numpy', 'local_search')
+WEEKDAYS_BATCH_SIZE = 1024  # Кандидатов в одном пакете движка 'numpy'
+OVER_SUPPLY_PENALTY = 100.0  # Штраф за каждую пару дня сверх числа мест (группа, аудитория) в его слотах
 
 def calculate_total_lessons_per_group(groups_data: dict) -> dict:
     group_total_lessons = {}
@@ -60,23 +65,168 @@ def create_random_daily_distribution(group_total_lessons_map: dict, days_list: l
             logger.warning(f"Не удалось полностью распределить {lessons_to_distribute_for_current_group} пар для группы {group_name} по дням.")
     return daily_schedule_template
 
+def calculate_group_day_capacity(groups_data: dict, group_names: list, max_weekday_lessons: int, max_weekend_lessons: int) -> np.ndarray:
+    # Лимит пар [группа, день]: не больше дневного лимита и не больше свободных слотов группы в этот день
+    group_day_caps = np.zeros((len(group_names), len(DAYS_OF_WEEK)), dtype=np.int64)
+    for day_idx, day_name in enumerate(DAYS_OF_WEEK):
+        day_limit = max_weekend_lessons if day_name in WEEKEND_DAYS else max_weekday_lessons
+        group_times_on_day = create_group_workday_times_dict(groups_data, day_name)
+        for group_idx, group_name in enumerate(group_names):
+            group_day_caps[group_idx, day_idx] = min(day_limit, len(group_times_on_day.get(group_name, [])))
+    return group_day_caps
+
+def calculate_day_room_supply(groups_data: dict, group_names: list) -> np.ndarray:
+    # Сколько пар вообще помещается в день: в каждом слоте не больше min(свободных групп, их аудиторий)
+    group_rooms = create_group_rooms_dict(groups_data)
+    day_supply = np.zeros(len(DAYS_OF_WEEK), dtype=np.int64)
+    for day_idx, day_name in enumerate(DAYS_OF_WEEK):
+        group_times_on_day = create_group_workday_times_dict(groups_data, day_name)
+        groups_by_slot = {}
+        for group_name in group_names:
+            for time_slot in group_times_on_day.get(group_name, []):
+                groups_by_slot.setdefault(time_slot, []).append(group_name)
+        for slot_groups in groups_by_slot.values():
+            slot_rooms = {room_info['name'] for group_name in slot_groups for room_info in group_rooms.get(group_name, [])}
+            day_supply[day_idx] += min(len(slot_groups), len(slot_rooms))
+    return day_supply
+
+def sample_daily_distributions_batch(group_totals: np.ndarray, day_caps: np.ndarray, batch_size: int,
+                                     rng: np.random.Generator) -> np.ndarray:
+    # Пакет распределений [кандидат, группа, день]. Как и create_random_daily_distribution, группа заполняет
+    # дни до лимита в случайном порядке; порядок первых попаданий равномерных попыток - случайная перестановка дней.
+    # day_caps - лимиты по дням [день] или по группам и дням [группа, день].
+    num_groups, num_days = len(group_totals), day_caps.shape[-1]
+    day_orders = np.argsort(rng.random((batch_size, num_groups, num_days)), axis=2)
+    caps_in_order = np.take_along_axis(np.broadcast_to(day_caps, (batch_size, num_groups, num_days)), day_orders, axis=2)
+    filled_before = np.cumsum(caps_in_order, axis=2) - caps_in_order
+    lessons_in_order = np.clip(group_totals[None, :, None] - filled_before, 0, caps_in_order)
+    distributions = np.empty_like(lessons_in_order)
+    np.put_along_axis(distributions, day_orders, lessons_in_order, axis=2)
+    return distributions
+
+def calculate_batch_fitness_weekdays(distributions: np.ndarray, target_daily_sum: int, variance_penalty_factor: float = 0.1,
+                                     day_supply: np.ndarray | None = None) -> np.ndarray:
+    # То же, что calculate_schedule_fitness_weekdays, для всего пакета сразу; с day_supply - плюс штраф за пары сверх емкости дня
+    daily_totals = distributions.sum(axis=1)
+    fitness = np.abs(daily_totals - target_daily_sum).sum(axis=1).astype(float)
+    if target_daily_sum > 0: fitness += daily_totals.var(axis=1) * variance_penalty_factor
+    if day_supply is not None: fitness += np.maximum(daily_totals - day_supply, 0).sum(axis=1) * OVER_SUPPLY_PENALTY
+    return fitness
+
+def _best_distribution_numpy(group_total_lessons: dict, group_day_caps: np.ndarray, day_supply: np.ndarray | None,
+                             num_candidates: int, target_daily_total: int, fitness_variance_penalty: float,
+                             batch_size: int, local_search: bool = False) -> (list | None):
+    group_names = list(group_total_lessons.keys())
+    group_totals = np.array([group_total_lessons[group_name] for group_name in group_names], dtype=np.int64)
+    for group_name, total_lessons, group_capacity in zip(group_names, group_totals.tolist(), group_day_caps.sum(axis=1).tolist()):
+        if total_lessons > group_capacity:
+            logger.warning(f"Не удалось полностью распределить {total_lessons - group_capacity} пар для группы {group_name} по дням.")
+    rng = np.random.default_rng(random.getrandbits(64))  # Зерно из random, которым управляет random_seed задачи
+    best_distribution, best_fitness = None, float('inf')
+    for batch_start in range(0, num_candidates, batch_size):
+        current_batch_size = min(batch_size, num_candidates - batch_start)
+        distributions = sample_daily_distributions_batch(group_totals, group_day_caps, current_batch_size, rng)
+        if local_search:  # Рестарты: спуск из каждого кандидата, сравниваются уже улучшенные
+            moves_done = sum(_improve_distribution_local_search(distribution, group_day_caps, day_supply, target_daily_total,
+                                                                fitness_variance_penalty, rng) for distribution in distributions)
+            logger.debug(f"distribute_lessons_by_days_aco_like: локальный поиск - {moves_done} переносов в {current_batch_size} стартах")
+        fitness_values = calculate_batch_fitness_weekdays(distributions, target_daily_total, fitness_variance_penalty, day_supply)
+        best_idx = int(np.argmin(fitness_values))
+        if fitness_values[best_idx] < best_fitness:
+            best_fitness = float(fitness_values[best_idx])
+            best_distribution = distributions[best_idx]
+            logger.debug(f"distribute_lessons_by_days_aco_like: кандидат {batch_start + best_idx + 1}, новый лучший фитнес: {best_fitness:.2f}")
+    if best_distribution is None: return None
+    if day_supply is not None:
+        best_distribution = best_distribution.copy()
+        trimmed_lessons = _trim_to_day_supply(best_distribution, day_supply)
+        if trimmed_lessons:
+            logger.warning(f"distribute_lessons_by_days_aco_like: {trimmed_lessons} пар не помещаются в аудитории дней и не получат квоту.")
+    return [{group_name: int(best_distribution[group_idx, day_idx]) for group_idx, group_name in enumerate(group_names)}
+            for day_idx in range(len(DAYS_OF_WEEK))]
+
+def _quota_move_delta(daily_totals: list, day_supply: list | None, from_day: int, to_day: int, target_daily_sum: int,
+                      variance_penalty_factor: float) -> float:
+    # Изменение фитнеса при переносе одной пары из from_day в to_day: меняются только два слагаемых модуля
+    # (и штрафа за превышение емкости), а сумма нагрузок постоянна, поэтому дисперсия меняется на 2 * (T_to - T_from + 1) / n
+    from_total, to_total = daily_totals[from_day], daily_totals[to_day]
+    delta = (abs(from_total - 1 - target_daily_sum) - abs(from_total - target_daily_sum)
+             + abs(to_total + 1 - target_daily_sum) - abs(to_total - target_daily_sum))
+    if target_daily_sum > 0: delta += 2.0 * (to_total - from_total + 1) / len(daily_totals) * variance_penalty_factor
+    if day_supply is not None:
+        delta += OVER_SUPPLY_PENALTY * ((to_total >= day_supply[to_day]) - (from_total > day_supply[from_day]))
+    return delta
+
+def _improve_distribution_local_search(quotas: np.ndarray, group_day_caps: np.ndarray, day_supply: np.ndarray | None,
+                                       target_daily_sum: int, variance_penalty_factor: float, rng: np.random.Generator) -> int:
+    # Спуск по матрице квот [группа, день] ходами "одна пара группы переносится в другой день".
+    # На каждом шаге берется пара дней с наибольшим улучшением, для которой есть группа с допустимым переносом.
+    # Возвращает число сделанных ходов; quotas меняется на месте.
+    num_days = group_day_caps.shape[1]
+    daily_totals = quotas.sum(axis=0).tolist()
+    day_supply = None if day_supply is None else day_supply.tolist()
+    moves_done = 0
+    while True:
+        day_pairs = sorted((_quota_move_delta(daily_totals, day_supply, from_day, to_day, target_daily_sum, variance_penalty_factor),
+                            from_day, to_day)
+                           for from_day in range(num_days) for to_day in range(num_days) if from_day != to_day)
+        for delta, from_day, to_day in day_pairs:
+            if delta >= -1e-12: return moves_done
+            movable_groups = np.flatnonzero((quotas[:, from_day] > 0) & (quotas[:, to_day] < group_day_caps[:, to_day]))
+            if movable_groups.size: break
+        else:
+            return moves_done
+        group_idx = movable_groups[rng.integers(movable_groups.size)]
+        quotas[group_idx, from_day] -= 1; quotas[group_idx, to_day] += 1
+        daily_totals[from_day] -= 1; daily_totals[to_day] += 1
+        moves_done += 1
+
+def _trim_to_day_supply(quotas: np.ndarray, day_supply: np.ndarray) -> int:
+    # Снимает пары сверх емкости дня у групп с наибольшей квотой в этот день: дневной ACO их все равно не разместит.
+    # Снятые пары остаются в общем пуле. Возвращает число снятых пар; quotas меняется на месте.
+    trimmed_lessons = 0
+    for day_idx, excess in enumerate((quotas.sum(axis=0) - day_supply).tolist()):
+        for _ in range(max(0, excess)):
+            quotas[int(np.argmax(quotas[:, day_idx])), day_idx] -= 1
+        trimmed_lessons += max(0, excess)
+    return trimmed_lessons
+
 def distribute_lessons_by_days_aco_like(
     groups_data: dict,
     num_iterations: int,
     target_daily_total: int,
     max_weekday_lessons_group: int,
     max_weekend_lessons_group: int,
-    fitness_variance_penalty: float = 0.1
+    fitness_variance_penalty: float = 0.1,
+    engine: str = 'local_search',  # 'local_search' - спуск переносами пар из каждого кандидата; 'numpy' - только пакет; 'python' - как раньше
+    batch_size: int = WEEKDAYS_BATCH_SIZE,
+    capacity_aware: bool = True  # Учитывать слоты групп по дням и емкость дня по аудиториям ('numpy', 'local_search')
     ) -> dict:
     if not groups_data: return {}
     group_total_lessons = calculate_total_lessons_per_group(groups_data)
     if not group_total_lessons or all(v == 0 for v in group_total_lessons.values()):
         logger.info("distribute_lessons_by_days_aco_like: Нет уроков для распределения.")
         return {day: {} for day in DAYS_OF_WEEK}
+    if engine not in WEEKDAYS_ENGINES:
+        raise ValueError(f"Неизвестный движок распределения по дням '{engine}', допустимы: {', '.join(WEEKDAYS_ENGINES)}")
     best_distribution_raw = None
     best_fitness = float('inf')
-    logger.debug(f"distribute_lessons_by_days_aco_like: Запуск {num_iterations} итераций.")
-    for iteration in range(num_iterations):
+    logger.debug(f"distribute_lessons_by_days_aco_like: Запуск {num_iterations} итераций ({engine}).")
+    if engine in ('numpy', 'local_search'):
+        group_names = list(group_total_lessons.keys())
+        if capacity_aware:
+            group_day_caps = calculate_group_day_capacity(groups_data, group_names, max_weekday_lessons_group, max_weekend_lessons_group)
+            day_supply = calculate_day_room_supply(groups_data, [group_name for group_name in group_names if group_total_lessons[group_name] > 0])
+            logger.debug(f"distribute_lessons_by_days_aco_like: емкость дней по аудиториям {day_supply.tolist()}")
+        else:
+            group_day_caps = np.array([[max_weekend_lessons_group if day_name in WEEKEND_DAYS else max_weekday_lessons_group
+                                        for day_name in DAYS_OF_WEEK]] * len(group_names), dtype=np.int64)
+            day_supply = None
+        # num_iterations - число случайных кандидатов ('numpy') или стартов спуска ('local_search'); последний пакет - сколько осталось
+        best_distribution_raw = _best_distribution_numpy(group_total_lessons, group_day_caps, day_supply, num_iterations,
+                                                         target_daily_total, fitness_variance_penalty, max(1, batch_size),
+                                                         local_search=engine == 'local_search')
+    for iteration in range(num_iterations if engine == 'python' else 0):
         current_distribution_raw = create_random_daily_distribution(group_total_lessons, DAYS_OF_WEEK, max_weekday_lessons_group, max_weekend_lessons_group, WEEKEND_DAYS)
         current_fitness = calculate_schedule_fitness_weekdays(current_distribution_raw, target_daily_total, fitness_variance_penalty)
         if current_fitness < best_fitness:
@@ -0,0 +1,74 @@
+import logging
+from .ant_algoritm_main import utilization_penalty
+
+logger = logging.getLogger(__name__)
+
+# Декомпозиция дня: группы, у которых нет общих аудиторий (например, после split_by_group_education_level
+# с аудиториями "своего" этажа), никак не влияют друг на друга. Такие кластеры решаются отдельными
+# Scheduler со своим феромоном, а расписания склеиваются. Словарь времен групп передается кластеру целиком,
+# чтобы набор слотов дня и знаменатель штрафа за недозагрузку совпадали с общей задачей.
+
+
+def find_room_components(lessons_for_day_by_group: dict, group_available_rooms_on_day: dict) -> list:
+    # Компоненты связности групп дня по общим аудиториям (система непересекающихся множеств)
+    parent = {group_name: group_name for group_name in lessons_for_day_by_group}
+
+    def find(group_name):
+        while parent[group_name] != group_name:
+            parent[group_name] = parent[parent[group_name]]
+            group_name = parent[group_name]
+        return group_name
+
+    room_owner = {}
+    for group_name in lessons_for_day_by_group:
+        for room_info in group_available_rooms_on_day.get(group_name, []):
+            owner = room_owner.setdefault(room_info['name'], group_name)
+            root_a, root_b = find(owner), find(group_name)
+            if root_a != root_b: parent[root_b] = root_a
+    components = {}
+    for group_name in lessons_for_day_by_group:
+        components.setdefault(find(group_name), []).append(group_name)
+    return list(components.values())
+
+
+def split_scheduler_job(scheduler_kwargs: dict) -> list:
+    # Одна задача Scheduler на кластер; при одном кластере задача возвращается без изменений
+    lessons_for_day_by_group = scheduler_kwargs['lessons_for_day_by_group']
+    components = find_room_components(lessons_for_day_by_group, scheduler_kwargs['group_available_rooms_on_day'])
+    if len(components) <= 1: return [scheduler_kwargs]
+    lessons_count = [sum(len(lessons_for_day_by_group[group_name]) for group_name in component) for component in components]
+    total_lessons = sum(lessons_count) or 1
+    random_seed, time_limit = scheduler_kwargs.get('random_seed'), scheduler_kwargs.get('time_limit_seconds')
+    component_jobs = []
+    for component_idx, component in enumerate(components):
+        component_jobs.append(dict(
+            scheduler_kwargs,
+            lessons_for_day_by_group={group_name: lessons_for_day_by_group[group_name] for group_name in component},
+            random_seed=None if random_seed is None else [random_seed, component_idx],
+            # Кластеры делят лимит времени дня пропорционально числу уроков, как дни делят бюджет задачи
+            time_limit_seconds=None if not time_limit else time_limit * lessons_count[component_idx] / total_lessons))
+    logger.debug(f"ACO Daily: день разбит на {len(components)} независимых кластеров, уроков: {lessons_count}")
+    return component_jobs
+
+
+def merge_component_results(scheduler_kwargs: dict, component_results: list) -> tuple:
+    # component_results - список (расписание, фитнес) кластеров; возвращает (расписание дня, фитнес дня).
+    # Штраф за недозагрузку нелинеен, поэтому он пересчитывается по суммарному числу размещенных пар.
+    if len(component_results) == 1: return component_results[0]
+    group_available_times_on_day = scheduler_kwargs['group_available_times_on_day']
+    total_possible_placements = sum(len(times) for times in group_available_times_on_day.values())
+
+    def day_utilization_penalty(placed_lessons_count):
+        return utilization_penalty(placed_lessons_count, total_possible_placements,
+                                   scheduler_kwargs.get('slot_utilization_threshold', 0.6),
+                                   scheduler_kwargs.get('penalty_slot_underutilization_coeff', 30))
+
+    merged_schedule, merged_fitness, total_placed = {}, 0.0, 0
+    for component_schedule, component_fitness in component_results:
+        placed_lessons_count = sum(len(items_in_slot) for items_in_slot in component_schedule.values())
+        merged_fitness += component_fitness - day_utilization_penalty(placed_lessons_count)
+        total_placed += placed_lessons_count
+        for time_slot, items_in_slot in component_schedule.items():
+            merged_schedule.setdefault(time_slot, []).extend(items_in_slot)
+    merged_schedule = {time_slot: merged_schedule[time_slot] for time_slot in sorted(merged_schedule)}
+    return merged_schedule, merged_fitness + day_utilization_penalty(total_placed)
@@ -0,0 +1,156 @@
+import time
+import logging
+from .parser import load_and_parse_data
+from .additional_functions import (load_subject_equipment_requirements_from_file, load_special_room_assignments_from_file,
+                                   create_pairs_groups_data, load_equipment_tag_weights)
+from .split_program import split_by_shift, split_by_group_education_level
+from .ant_algoritm_weekdays import DAYS_OF_WEEK, WEEKEND_DAYS
+from .matching import hopcroft_karp
+
+logger = logging.getLogger(__name__)
+
+# Предварительная проверка входных данных до запуска ACO. Все оценки - верхние границы числа пар,
+# которые вообще можно разместить, поэтому превышение спроса над ними означает, что расписание
+# заведомо будет неполным:
+#   * по группе: сумма по дням min(слотов группы в день, лимит пар в день);
+#   * по слотам: в каждом (день, слот) не больше min(групп, аудиторий) пар;
+#   * по тегам: пары с тегом - не больше, чем аудиторий с тегом в слотах, где такие группы свободны;
+#   * паросочетание: в каждом (день, слот) не больше максимального паросочетания "группа - аудитория".
+# Пары без подходящей аудитории и переполнение отдельной группы - предупреждения: генерация все равно
+# даст частичное расписание. Статус "infeasible" - только при нарушении общих границ (теги, слоты, паросочетание).
+
+DENSE_LOAD_RATIO = 0.9  # Предупреждение, если спрос выше этой доли верхней границы
+
+
+def _usable_rooms(lesson_info: dict, group_rooms: list, special_room_overrides: dict) -> frozenset:
+    required_tags = set(lesson_info.get('required_tags', []))
+    override_room_name = special_room_overrides.get(lesson_info['name'])
+    return frozenset(room_info['name'] for room_info in group_rooms
+                     if required_tags.issubset(room_info.get('tags', []))
+                     and (override_room_name is None or room_info['name'] == override_room_name))
+
+
+def analyse_feasibility(groups_data: dict, lessons_pool_per_group: dict, special_room_overrides: dict,
+                        max_weekday_lessons: int = 2, max_weekend_lessons: int = 3) -> dict:
+    start_time = time.perf_counter()
+    errors, warnings = [], []
+    day_caps = {day_name: max_weekend_lessons if day_name in WEEKEND_DAYS else max_weekday_lessons for day_name in DAYS_OF_WEEK}
+    group_times, group_usable_rooms, group_placeable = {}, {}, {}
+    total_lessons = 0
+    for group_name, lessons_list in lessons_pool_per_group.items():
+        if not lessons_list: continue
+        settings = groups_data.get(group_name, [])
+        free_times = settings[0] if len(settings) > 0 and isinstance(settings[0], dict) else {}
+        group_rooms = settings[2] if len(settings) > 2 and isinstance(settings[2], list) else []
+        group_times[group_name] = {day_name: list(free_times.get(day_name, [])) for day_name in DAYS_OF_WEEK}
+        total_lessons += len(lessons_list)
+        unplaceable_by_lesson = {}
+        usable_rooms_union = set()
+        placeable = []
+        for lesson_info in lessons_list:
+            usable_rooms = _usable_rooms(lesson_info, group_rooms, special_room_overrides)
+            if usable_rooms:
+                usable_rooms_union.update(usable_rooms)
+                placeable.append((lesson_info, usable_rooms))
+            else:
+                unplaceable_by_lesson[lesson_info['name']] = unplaceable_by_lesson.get(lesson_info['name'], 0) + 1
+        for lesson_name, count in unplaceable_by_lesson.items():
+            override_room_name = special_room_overrides.get(lesson_name)
+            reason = (f"спец. аудитория {override_room_name} недоступна группе или не подходит по оборудованию"
+                      if override_room_name else "нет аудитории с нужным оборудованием "
+                      f"({', '.join(next(l['required_tags'] for l in lessons_list if l['name'] == lesson_name))})")
+            warnings.append(f"Группа {group_name}: пары «{lesson_name}» ({count} шт.) нельзя разместить - {reason}.")
+        group_usable_rooms[group_name] = usable_rooms_union
+        group_placeable[group_name] = placeable
+        group_capacity = sum(min(len(group_times[group_name][day_name]), day_caps[day_name]) for day_name in DAYS_OF_WEEK)
+        if len(placeable) > group_capacity:
+            warnings.append(f"Группа {group_name}: нужно {len(placeable)} пар, а слотов с учетом лимита пар в день "
+                            f"не больше {group_capacity}.")
+    placeable_total = sum(len(placeable) for placeable in group_placeable.values())
+    # Границы по слотам и паросочетанию; в день группа дает не больше min(своих слотов, лимит дня)
+    counting_bound, matching_bound = 0, 0
+    tag_demand, tag_supply = {}, {}
+    for group_name, placeable in group_placeable.items():
+        for tag in {tag for lesson_info, _ in placeable for tag in lesson_info.get('required_tags', [])}:
+            tag_demand[tag] = tag_demand.get(tag, 0) + sum(1 for lesson_info, _ in placeable
+                                                           if tag in lesson_info.get('required_tags', []))
+    room_tags = {room_info['name']: set(room_info.get('tags', [])) for settings in groups_data.values()
+                 if len(settings) > 2 and isinstance(settings[2], list) for room_info in settings[2]}
+    matching_cache = {}
+    for day_name in DAYS_OF_WEEK:
+        groups_by_slot = {}
+        for group_name in group_placeable:
+            if not group_placeable[group_name]: continue
+            for time_slot in group_times[group_name][day_name]:
+                groups_by_slot.setdefault(time_slot, []).append(group_name)
+        day_group_limit = sum(min(len(group_times[group_name][day_name]), day_caps[day_name], len(group_placeable[group_name]))
+                              for group_name in group_placeable)
+        day_counting, day_matching = 0, 0
+        for time_slot, slot_groups in groups_by_slot.items():
+            slot_rooms = sorted(set().union(*(group_usable_rooms[group_name] for group_name in slot_groups)))
+            day_counting += min(len(slot_groups), len(slot_rooms))
+            cache_key = frozenset(slot_groups)
+            if cache_key not in matching_cache:
+                room_ids = {room_name: idx for idx, room_name in enumerate(slot_rooms)}
+                adjacency = [[room_ids[room_name] for room_name in group_usable_rooms[group_name]] for group_name in slot_groups]
+                match_left, _ = hopcroft_karp(adjacency, len(slot_rooms))
+                matching_cache[cache_key] = sum(1 for room_idx in match_left if room_idx >= 0)
+            day_matching += matching_cache[cache_key]
+            for tag in tag_demand:
+                tag_groups = sum(1 for group_name in slot_groups
+                                 if any(tag in lesson_info.get('required_tags', []) for lesson_info, _ in group_placeable[group_name]))
+                tag_rooms = sum(1 for room_name in slot_rooms if tag in room_tags.get(room_name, ()))
+                tag_supply[tag] = tag_supply.get(tag, 0) + min(tag_groups, tag_rooms)
+        counting_bound += min(day_counting, day_group_limit)
+        matching_bound += min(day_matching, day_group_limit)
+    for tag, demand in sorted(tag_demand.items()):
+        if demand > tag_supply.get(tag, 0):
+            errors.append(f"Оборудование «{tag}»: нужно {demand} пар, а аудиторий с ним в доступных слотах "
+                          f"хватит не больше чем на {tag_supply.get(tag, 0)}.")
+    placeable_upper_bound = min(counting_bound, matching_bound)
+    if placeable_total > counting_bound:
+        errors.append(f"По числу групп и аудиторий в слотах можно разместить не больше {counting_bound} из {placeable_total} пар.")
+    elif placeable_total > matching_bound:
+        errors.append(f"С учетом того, какие аудитории доступны каким группам, можно разместить не больше "
+                      f"{matching_bound} из {placeable_total} пар.")
+    elif placeable_upper_bound and placeable_total > DENSE_LOAD_RATIO * placeable_upper_bound:
+        warnings.append(f"Плотная загрузка: {placeable_total} пар при верхней границе {placeable_upper_bound}. "
+                        f"Часть пар может остаться нераспределенной.")
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    logger.info(f"Проверка выполнимости: {len(errors)} ошибок, {len(warnings)} предупреждений, {elapsed_ms:.1f} мс")
+    return {"status": "infeasible" if errors else "ok", "errors": errors, "warnings": warnings,
+            "total_lessons": total_lessons, "placeable_upper_bound": min(placeable_upper_bound, placeable_total),
+            "elapsed_ms": elapsed_ms}
+
+
+def analyse_input_files(groups_csv_path: str, weekdays_csv_path: str, algo_params: dict) -> dict:
+    # Те же шаги, что и в начале generate_full_schedule_sync (парсинг, конфиги, смены, фильтр по уровню
+    # образования, пул уроков); algo_params - тот же словарь параметров, что получает генерация в algorithm_runner
+    parser_result = load_and_parse_data(groups_csv_path, weekdays_csv_path)
+    if parser_result["status"] == "error":
+        return {"status": "error", "errors": [f"Ошибка в файле '{parser_result.get('file_context', 'N/A')}': {parser_result['message']}"],
+                "warnings": [], "total_lessons": 0, "placeable_upper_bound": 0, "elapsed_ms": 0.0}
+    groups_data = split_by_shift(parser_result["data"])
+    if algo_params["filter_target_year_prefixes"] and algo_params["filter_required_room_prefix"]:
+        groups_data = split_by_group_education_level(groups_data, target_year_prefixes=algo_params["filter_target_year_prefixes"],
+                                                     required_first_digit_of_room=algo_params["filter_required_room_prefix"])
+    lessons_pool_per_group = create_pairs_groups_data(groups_data, load_subject_equipment_requirements_from_file(),
+                                                      load_equipment_tag_weights(), algo_params["default_tag_weight_for_priority_calc"])
+    return analyse_feasibility(groups_data, lessons_pool_per_group, load_special_room_assignments_from_file(),
+                               algo_params["aco_weekdays_max_weekday_lessons"], algo_params["aco_weekdays_max_weekend_lessons"])
+
+
+def format_feasibility_report(report: dict, max_issues: int = 10) -> str:
+    lines = []
+    if report["status"] == "ok":
+        lines.append(f"Проверка входных данных пройдена{' с предупреждениями' if report['warnings'] else ''}: "
+                     f"{report['total_lessons']} пар.")
+    elif report["status"] == "error":
+        lines.append("Не удалось проверить входные данные.")
+    else:
+        lines.append(f"Входные данные невыполнимы: разместить можно не больше {report['placeable_upper_bound']} "
+                     f"из {report['total_lessons']} пар.")
+    issues = report["errors"] + report["warnings"]
+    lines.extend(f"- {issue}" for issue in issues[:max_issues])
+    if len(issues) > max_issues: lines.append(f"... и еще {len(issues) - max_issues}.")
+    return "\n".join(lines)
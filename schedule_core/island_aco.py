@@ -0,0 +1,74 @@
+import logging
+import multiprocessing
+from .ant_algoritm_main import Scheduler
+
+logger = logging.getLogger(__name__)
+
+# Островная модель: K колоний решают один и тот же день в отдельных процессах, у каждой свой феромон.
+# Каждые exchange_interval итераций острова присылают координатору лучшее решение, получают лучшее
+# решение всех островов и откладывают по нему феромон. Итог - лучшее решение среди островов.
+
+
+def _island_seed(random_seed: int | list | None, island_idx: int):
+    if random_seed is None: return None
+    return [*random_seed, island_idx] if isinstance(random_seed, list) else [random_seed, island_idx]
+
+
+def _run_island(connection, scheduler_kwargs: dict, exchange_interval: int):
+    try:
+        scheduler = Scheduler(**scheduler_kwargs)
+        scheduler.begin_run()
+        while True:
+            island_finished = scheduler.run_iterations(exchange_interval)
+            connection.send((scheduler.best_fitness_for_day, scheduler._best_assignment, island_finished))
+            global_fitness, global_assignment, stop_all = connection.recv()
+            if global_assignment is not None and global_fitness < scheduler.best_fitness_for_day:
+                scheduler.accept_migrant(*global_assignment, global_fitness)
+            if stop_all: break
+        best_schedule_for_day = scheduler.finish_run()
+        connection.send((scheduler.best_fitness_for_day, best_schedule_for_day))
+    except Exception as e:
+        logger.error(f"ACO Island: ошибка в процессе острова: {e}", exc_info=True)
+        connection.send(None)
+    finally:
+        connection.close()
+
+
+def run_island_aco(scheduler_kwargs: dict, num_islands: int, exchange_interval: int = 10) -> tuple:
+    # Возвращает (лучшее расписание дня, его фитнес)
+    exchange_interval = max(1, int(exchange_interval))
+    connections, processes = [], []
+    for island_idx in range(num_islands):
+        parent_connection, child_connection = multiprocessing.Pipe()
+        island_kwargs = dict(scheduler_kwargs, random_seed=_island_seed(scheduler_kwargs.get('random_seed'), island_idx))
+        process = multiprocessing.Process(target=_run_island, args=(child_connection, island_kwargs, exchange_interval),
+                                          daemon=False)
+        process.start()
+        child_connection.close()
+        connections.append(parent_connection)
+        processes.append(process)
+    try:
+        epoch = 0
+        while True:
+            epoch += 1
+            reports = [connection.recv() for connection in connections]
+            if any(report is None for report in reports):
+                raise RuntimeError("Один из островов ACO завершился с ошибкой")
+            best_fitness, best_assignment, _ = min(reports, key=lambda report: report[0])
+            # Останавливаются все острова сразу: итераций у них поровну, а досрочная остановка одного
+            # (нижняя граница, лимит времени) относится ко всем
+            stop_all = any(island_finished for _, _, island_finished in reports)
+            for connection in connections:
+                connection.send((best_fitness, best_assignment, stop_all))
+            logger.debug(f"ACO Island: обмен {epoch}, лучший фитнес {best_fitness:.2f}")
+            if stop_all: break
+        final_reports = [connection.recv() for connection in connections]
+        if any(report is None for report in final_reports):
+            raise RuntimeError("Один из островов ACO завершился с ошибкой")
+        best_fitness, best_schedule_for_day = min(final_reports, key=lambda report: report[0])
+        return best_schedule_for_day, best_fitness
+    finally:
+        for connection in connections: connection.close()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive(): process.terminate()
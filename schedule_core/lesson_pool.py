@@ -0,0 +1,36 @@
+import heapq
+import random
+from collections import deque
+
+
+class LessonPool:
+    # Недельный пул уроков группы для отбора по дневным квотам. Строится один раз:
+    # приоритетные уроки (спец. аудитория или placement_priority > 0) - в куче по ключу
+    # (нет спец. аудитории, -приоритет, порядок в пуле), остальные - в один раз перемешанной очереди.
+    # Уроки хранятся списком, в куче и очереди - только их id. Отбор квоты стоит O(quota log n).
+    def __init__(self, lessons: list, special_room_overrides: dict, rng: random.Random = None):
+        self.lessons = list(lessons)
+        self._priority_heap = []
+        regular_lesson_ids = []
+        for lesson_id, lesson in enumerate(self.lessons):
+            has_override = lesson['name'] in special_room_overrides
+            if has_override or lesson.get('placement_priority', 0) > 0:
+                self._priority_heap.append((not has_override, -lesson.get('placement_priority', 0), lesson_id))
+            else:
+                regular_lesson_ids.append(lesson_id)
+        heapq.heapify(self._priority_heap)
+        # Один shuffle дает то же равномерное распределение, что и перемешивание остатка перед каждым днем
+        (rng or random).shuffle(regular_lesson_ids)
+        self._regular_queue = deque(regular_lesson_ids)
+
+    def __len__(self) -> int:
+        return len(self._priority_heap) + len(self._regular_queue)
+
+    def take(self, quota: int) -> list:
+        # Сначала приоритетные уроки по ключу кучи, затем случайные обычные
+        selected_lessons = []
+        while len(selected_lessons) < quota and self._priority_heap:
+            selected_lessons.append(self.lessons[heapq.heappop(self._priority_heap)[2]])
+        while len(selected_lessons) < quota and self._regular_queue:
+            selected_lessons.append(self.lessons[self._regular_queue.popleft()])
+        return selected_lessons
@@ -1,8 +1,10 @@
 import os
 import copy
 import random
+import asyncio
 import traceback
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from aiogram.utils.markdown import html_decoration as hd
 from .parser import load_and_parse_data
 from .additional_functions import (load_subject_equipment_requirements_from_file,
@@ -11,6 +13,11 @@ from .additional_functions import (load_subject_equipment_requirements_from_file
 from .split_program import split_by_shift, split_by_group_education_level
 from .ant_algoritm_weekdays import distribute_lessons_by_days_aco_like, DAYS_OF_WEEK
 from .ant_algoritm_main import Scheduler as DailySchedulerACO
+from .island_aco import run_island_aco
+from .feasibility import analyse_feasibility, format_feasibility_report
+from .decomposition import split_scheduler_job, merge_component_results
+from .lesson_pool import LessonPool
+from .weekly_timetable import build_weekly_scheduler_job, split_weekly_schedule, weekly_iterations_for_daily_budget
 
 try:
     from .transfer_to_table import create_schedule_excel
@@ -22,14 +29,110 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+SCHEDULING_MODES = ('daily', 'weekly')
 
-async def generate_full_schedule(
+
+def _solve_daily_schedule(day_name: str, scheduler_kwargs: dict, num_islands: int = 1,
+                          island_exchange_interval: int = 10) -> tuple:
+    if num_islands > 1:
+        best_schedule_for_day, best_fitness_for_day = run_island_aco(scheduler_kwargs, num_islands, island_exchange_interval)
+        return day_name, best_schedule_for_day, best_fitness_for_day
+    daily_scheduler = DailySchedulerACO(**scheduler_kwargs)
+    best_schedule_for_day = daily_scheduler.run_aco()
+    return day_name, best_schedule_for_day, daily_scheduler.best_fitness_for_day
+
+
+def _split_time_budget(time_budget_seconds: float, lessons_count_by_day: dict) -> dict:
+    # Бюджет времени задачи делится между днями пропорционально числу уроков дня
+    total_lessons = sum(lessons_count_by_day.values())
+    if total_lessons <= 0: return {day_name: 0.0 for day_name in lessons_count_by_day}
+    return {day_name: time_budget_seconds * lessons_count / total_lessons
+            for day_name, lessons_count in lessons_count_by_day.items()}
+
+
+def _run_daily_schedulers(daily_scheduler_jobs: dict, max_workers: int | None = None, num_islands: int = 1,
+                          island_exchange_interval: int = 10, decompose: bool = True):
+    # Дни независимы друг от друга после отбора уроков, поэтому run_aco() для них можно запускать
+    # в отдельных процессах. С decompose день дополнительно делится на кластеры групп без общих аудиторий,
+    # и в пул уходит каждый кластер; день отдается, когда готовы все его кластеры.
+    if not daily_scheduler_jobs: return
+    component_jobs = {day_name: split_scheduler_job(scheduler_kwargs) if decompose else [scheduler_kwargs]
+                      for day_name, scheduler_kwargs in daily_scheduler_jobs.items()}
+    solve_args = [(day_name, component_kwargs, num_islands, island_exchange_interval)
+                  for day_name, day_jobs in component_jobs.items() for component_kwargs in day_jobs]
+    component_results = {day_name: [] for day_name in component_jobs}
+    # С островами процессы запускает сама островная модель, поэтому дни решаются по очереди, без вложенного пула
+    if num_islands > 1: max_workers = 1
+    for day_name, best_schedule_for_component, best_fitness_for_component in _solve_in_pool(solve_args, max_workers):
+        component_results[day_name].append((best_schedule_for_component, best_fitness_for_component))
+        if len(component_results[day_name]) == len(component_jobs[day_name]):
+            yield (day_name, *merge_component_results(daily_scheduler_jobs[day_name], component_results[day_name]))
+
+
+def _solve_in_pool(solve_args: list, max_workers: int | None = None):
+    num_workers = min(max_workers or os.cpu_count() or 1, len(solve_args))
+    if num_workers <= 1:
+        for args in solve_args:
+            yield _solve_daily_schedule(*args)
+        return
+    with ProcessPoolExecutor(max_workers=num_workers) as day_pool:
+        futures = [day_pool.submit(_solve_daily_schedule, *args) for args in solve_args]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _generate_weekly_schedule(processed_groups_data: dict, all_lessons_pool_per_group: dict, aco_scheduler_params: dict,
+                              output_dir: str, update_progress: callable, task_id_for_progress: int, total_major_steps: int,
+                              max_weekday_lessons: int, max_weekend_lessons: int, random_seed: int | None,
+                              time_budget_seconds: float | None, parallel_workers: int | None, num_islands: int,
+                              island_exchange_interval: int, decompose: bool) -> dict:
+    # Шаги 5-6 недельного режима: без квот по дням, одна колония (или кластеры/острова) на всю неделю
+    num_week_days = len(DAYS_OF_WEEK)
+    weekly_job = dict(aco_scheduler_params, **build_weekly_scheduler_job(processed_groups_data, all_lessons_pool_per_group,
+                                                                         max_weekday_lessons, max_weekend_lessons),
+                      random_seed=random_seed)
+    # Тот же бюджет времени, что у семи дневных запусков: общий бюджет задачи и/или лимит дня * 7
+    day_time_limit = weekly_job['time_limit_seconds']
+    week_time_limits = [limit for limit in (time_budget_seconds, day_time_limit and day_time_limit * num_week_days) if limit]
+    weekly_job['time_limit_seconds'] = min(week_time_limits) if week_time_limits else None
+    # num_iterations задан на день; для недели - та же работа, что у семи дневных запусков (без лимитов времени
+    # только он ограничивает колонию)
+    weekly_job['num_iterations'] = weekly_iterations_for_daily_budget(weekly_job['num_iterations'],
+                                                                      weekly_job['group_available_times_on_day'])
+    total_lessons = sum(len(lst) for lst in weekly_job['lessons_for_day_by_group'].values())
+    logger.info(f"Task_{task_id_for_progress}: Шаг 6 - Запуск недельного DailySchedulerACO для {total_lessons} уроков "
+                f"(итераций: {weekly_job['num_iterations']}, лимит времени: {weekly_job['time_limit_seconds']}).")
+    update_progress(6, "Планирование недели одной колонией.", sub_progress=0, sub_total=num_week_days)
+    _, weekly_schedule, weekly_fitness = next(_run_daily_schedulers({'week': weekly_job}, parallel_workers, num_islands,
+                                                                    island_exchange_interval, decompose))
+    logger.info(f"Task_{task_id_for_progress}:    Расписание на неделю создано. Фитнес: {weekly_fitness}")
+    final_weekly_schedule = split_weekly_schedule(weekly_schedule)
+    os.makedirs(output_dir, exist_ok=True)
+    generated_excel_files = []
+    for day_name in DAYS_OF_WEEK:
+        excel_filename_for_day = os.path.join(output_dir, f"{day_name}.xlsx")
+        create_schedule_excel(final_weekly_schedule[day_name], excel_filename_for_day, day_name)
+        generated_excel_files.append(excel_filename_for_day)
+    unplaced_lessons = total_lessons - sum(len(items_in_slot) for items_in_slot in weekly_schedule.values())
+    final_user_message = "Генерация успешно завершена!"
+    if unplaced_lessons > 0:
+        final_user_message = f"Генерация завершена. ВНИМАНИЕ: {unplaced_lessons} уроков не удалось разместить (возможно, из-за конфликтов или нехватки слотов/аудиторий)."
+        logger.warning(f"Task_{task_id_for_progress}: {final_user_message}")
+    update_progress(total_major_steps, final_user_message, sub_progress=num_week_days, sub_total=num_week_days)
+    logger.info(f"Task_{task_id_for_progress}: generate_full_schedule успешно завершается. {final_user_message}")
+    return {"status": "success", "files": generated_excel_files, "data": final_weekly_schedule,
+            "message": final_user_message}
+
+
+def generate_full_schedule_sync(
         groups_csv_path: str, weekdays_csv_path: str, output_dir: str,
         progress_callback: callable = None, task_id_for_progress: int = 0,
         filter_target_year_prefixes: list = None, filter_required_room_prefix: str = None,
         aco_weekdays_iterations: int = 100, aco_weekdays_target_daily_total: int = 30,
         aco_weekdays_max_weekday_lessons: int = 2, aco_weekdays_max_weekend_lessons: int = 3,
         aco_weekdays_fitness_variance_penalty: float = 0.1,
+        aco_weekdays_engine: str = 'local_search',  # 'local_search', 'numpy' (случайные кандидаты пакетами) или 'python'
+        aco_weekdays_capacity_aware: bool = True,  # Квоты с учетом слотов групп по дням и аудиторий дня
         aco_daily_num_ants: int = 10, aco_daily_num_iterations: int = 50,
         aco_daily_evaporation_rate: float = 0.1, aco_daily_pheromone_deposit: float = 100.0,
         aco_daily_alpha: float = 1.0, aco_daily_beta: float = 1.0,
@@ -38,14 +141,40 @@ async def generate_full_schedule(
         aco_daily_penalty_slot_underutil_coeff: int = 30, aco_daily_slot_util_threshold: float = 0.6,
         default_tag_weight_for_priority_calc: int = 1,
         aco_daily_max_consecutive_lessons: int = 2,  # Новый параметр из предыдущего шага
-        aco_daily_penalty_consecutive: int = 7  # Новый параметр из предыдущего шага
+        aco_daily_penalty_consecutive: int = 7,  # Новый параметр из предыдущего шага
+        aco_daily_parallel_workers: int | None = None,  # Процессов для дней (None - по числу ядер, 1 - последовательно)
+        random_seed: int | None = None,  # Зерно ГСЧ для воспроизводимой генерации (None - случайное)
+        aco_daily_time_limit: float | None = None,  # Лимит времени (сек) на один день
+        aco_daily_stagnation_iterations: int | None = None,  # Остановка дня после N итераций без улучшения
+        time_budget_seconds: float | None = None,  # Общий бюджет времени задачи, делится между днями по числу уроков
+        aco_daily_local_search: str | None = None,  # Доводка лучшего решения дня: None, 'hill_climbing' или 'tabu'
+        aco_daily_local_search_time_limit: float = 1.0,  # Лимит времени (сек) доводки на один день
+        aco_daily_local_search_max_steps: int = 5000,
+        aco_daily_tabu_tenure: int = 10,
+        aco_daily_lesson_ordering: str = 'random',  # Порядок уроков у муравья: 'random', 'priority', 'most_constrained'
+        aco_daily_assignment_mode: str = 'joint',  # 'joint' или 'slot_then_room' (аудитории - паросочетанием)
+        aco_daily_candidate_list_size: int | None = None,  # Размер списка кандидатов ACS (None - полный перебор)
+        aco_daily_candidate_list_refresh: int = 5,
+        aco_daily_islands: int = 1,  # Колоний (процессов) на один день; 1 - без островной модели
+        aco_daily_island_exchange_interval: int = 10,  # Обмен лучшими решениями между островами раз в N итераций
+        aco_daily_engine: str = 'ants',  # 'ants' или 'batched' (все муравьи итерации векторно, для 50-200 муравьев)
+        feasibility_check: bool = True,  # Отклонять заведомо невыполнимые входные данные до запуска ACO
+        aco_daily_decompose: bool = True,  # Решать кластеры групп без общих аудиторий отдельными колониями
+        aco_daily_pheromone_update: str = 'top_ants',  # 'top_ants' или 'mmas' (Max-Min Ant System)
+        aco_daily_mmas_deposit_source: str = 'iteration_best',  # MMAS: 'iteration_best' или 'global_best'
+        aco_daily_mmas_p_best: float = 0.05,
+        aco_daily_mmas_reinit_iterations: int | None = 25,  # MMAS: сброс феромона после N итераций без улучшения
+        scheduling_mode: str = 'daily'  # 'daily' (квоты по дням + колония на день) или 'weekly' (одна колония на неделю)
 ) -> dict:
-    logger.info(f"Task_{task_id_for_progress}: Начало generate_full_schedule.")
+    logger.info(f"Task_{task_id_for_progress}: Начало generate_full_schedule_sync.")
+    if scheduling_mode not in SCHEDULING_MODES:
+        raise ValueError(f"Неизвестный режим планирования '{scheduling_mode}', допустимые: {', '.join(SCHEDULING_MODES)}")
     current_step_msg = "Инициализация..."
+    if random_seed is not None: random.seed(random_seed)
     try:
         total_major_steps = 6
 
-        async def update_progress(step_num, message, sub_progress=None, sub_total=None):
+        def update_progress(step_num, message, sub_progress=None, sub_total=None):
             nonlocal current_step_msg;
             current_step_msg = message
             logger.debug(
@@ -64,26 +193,26 @@ async def generate_full_schedule(
                     filled_sub_bar = int((sub_progress / sub_total) * sub_bar_len)
                     sub_bar = "[" + "■" * filled_sub_bar + "□" * (sub_bar_len - filled_sub_bar) + "]"
                     full_message += f"\nДни: {sub_bar} {sub_progress}/{sub_total}"
-                await progress_callback(full_message)
+                progress_callback(full_message)
 
-        await update_progress(0, "Инициализация...")
+        update_progress(0, "Инициализация...")
         logger.info(f"Task_{task_id_for_progress}: Шаг 1 - Загрузка и парсинг данных.")
         parser_result = load_and_parse_data(groups_csv_path, weekdays_csv_path)
         if parser_result["status"] == "error":
             error_msg = f"Ошибка в файле '{parser_result.get('file_context', 'N/A')}': {parser_result['message']}"
             logger.error(f"Task_{task_id_for_progress}: {error_msg}");
-            await update_progress(1, f"Ошибка: {parser_result['message']}")
+            update_progress(1, f"Ошибка: {parser_result['message']}")
             return {"status": "error", "message": error_msg}
         raw_groups_data = parser_result["data"]
         logger.info(f"Task_{task_id_for_progress}: Шаг 1 - Данные загружены, {len(raw_groups_data)} групп.")
-        await update_progress(1, "Загрузка данных завершена.")
+        update_progress(1, "Загрузка данных завершена.")
         logger.info(f"Task_{task_id_for_progress}: Шаг 2 - Загрузка конфигураций.")
         equipment_definitions = load_subject_equipment_requirements_from_file()
         special_room_overrides = load_special_room_assignments_from_file()
         tag_weights_map = load_equipment_tag_weights()
         logger.info(
             f"Task_{task_id_for_progress}: Шаг 2 - Конфигурации загружены (оборуд: {len(equipment_definitions)}, спец.ауд: {len(special_room_overrides)}, веса тегов: {len(tag_weights_map)})")
-        await update_progress(2, "Загрузка конфигураций завершена.")
+        update_progress(2, "Загрузка конфигураций завершена.")
         logger.info(f"Task_{task_id_for_progress}: Шаг 3 - Применение фильтров.")
         groups_after_shift_split = split_by_shift(raw_groups_data)
         if filter_target_year_prefixes and filter_required_room_prefix:
@@ -93,7 +222,7 @@ async def generate_full_schedule(
         else:
             processed_groups_data = groups_after_shift_split
         logger.info(f"Task_{task_id_for_progress}: Шаг 3 - Фильтры применены.")
-        await update_progress(3, "Применение фильтров к группам завершено.")
+        update_progress(3, "Применение фильтров к группам завершено.")
         logger.info(f"Task_{task_id_for_progress}: Шаг 4 - Формирование пула уроков.")
         all_lessons_pool_per_group = create_pairs_groups_data(processed_groups_data, equipment_definitions,
                                                               tag_weights_map, default_tag_weight_for_priority_calc)
@@ -101,26 +230,76 @@ async def generate_full_schedule(
         logger.info(
             f"Task_{task_id_for_progress}: Шаг 4 - Пул уроков сформирован. Всего пар: {total_lessons_to_schedule_overall}")
         if total_lessons_to_schedule_overall == 0:
-            await update_progress(total_major_steps, "Нет уроков для планирования.")
+            update_progress(total_major_steps, "Нет уроков для планирования.")
             return {"status": "warning", "message": "В загруженных файлах нет уроков для планирования.", "files": []}
-        await update_progress(4, f"Пул из {total_lessons_to_schedule_overall} уроков сформирован.")
+        if feasibility_check:
+            feasibility_report = analyse_feasibility(processed_groups_data, all_lessons_pool_per_group, special_room_overrides,
+                                                     aco_weekdays_max_weekday_lessons, aco_weekdays_max_weekend_lessons)
+            if feasibility_report["status"] == "infeasible":
+                error_msg = format_feasibility_report(feasibility_report)
+                logger.error(f"Task_{task_id_for_progress}: {error_msg}")
+                update_progress(4, "Ошибка: входные данные невыполнимы.")
+                return {"status": "error", "message": error_msg}
+        update_progress(4, f"Пул из {total_lessons_to_schedule_overall} уроков сформирован.")
+        # Параметры колонии, общие для дневных задач и недельной задачи
+        aco_scheduler_params = dict(
+            special_room_overrides=special_room_overrides,
+            num_ants=aco_daily_num_ants,
+            num_iterations=aco_daily_num_iterations,
+            evaporation_rate=aco_daily_evaporation_rate,
+            pheromone_deposit_amount=aco_daily_pheromone_deposit,
+            alpha=aco_daily_alpha,
+            beta=aco_daily_beta,
+            penalty_unplaced_lesson=aco_daily_penalty_unplaced,
+            penalty_window_slot=aco_daily_penalty_window,
+            penalty_max_lessons_group_soft_coeff=aco_daily_penalty_max_lessons_coeff,
+            soft_limit_max_lessons_group=aco_daily_soft_limit_max_lessons,
+            penalty_slot_underutilization_coeff=aco_daily_penalty_slot_underutil_coeff,
+            slot_utilization_threshold=aco_daily_slot_util_threshold,
+            max_consecutive_lessons_for_group=aco_daily_max_consecutive_lessons,
+            penalty_consecutive_lessons=aco_daily_penalty_consecutive,
+            time_limit_seconds=aco_daily_time_limit,
+            stagnation_iterations=aco_daily_stagnation_iterations,
+            local_search_mode=aco_daily_local_search,
+            local_search_time_limit=aco_daily_local_search_time_limit,
+            local_search_max_steps=aco_daily_local_search_max_steps,
+            tabu_tenure=aco_daily_tabu_tenure,
+            lesson_ordering=aco_daily_lesson_ordering,
+            assignment_mode=aco_daily_assignment_mode,
+            candidate_list_size=aco_daily_candidate_list_size,
+            candidate_list_refresh=aco_daily_candidate_list_refresh,
+            engine=aco_daily_engine,
+            pheromone_update=aco_daily_pheromone_update,
+            mmas_deposit_source=aco_daily_mmas_deposit_source,
+            mmas_p_best=aco_daily_mmas_p_best,
+            mmas_reinit_iterations=aco_daily_mmas_reinit_iterations
+        )
+        if scheduling_mode == 'weekly':
+            return _generate_weekly_schedule(processed_groups_data, all_lessons_pool_per_group, aco_scheduler_params,
+                                             output_dir, update_progress, task_id_for_progress, total_major_steps,
+                                             aco_weekdays_max_weekday_lessons, aco_weekdays_max_weekend_lessons,
+                                             random_seed, time_budget_seconds, aco_daily_parallel_workers,
+                                             aco_daily_islands, aco_daily_island_exchange_interval, aco_daily_decompose)
         logger.info(f"Task_{task_id_for_progress}: Шаг 5 - Распределение квот пар по дням.")
         daily_lessons_quota_distribution = distribute_lessons_by_days_aco_like(processed_groups_data,
                                                                                num_iterations=aco_weekdays_iterations,
                                                                                target_daily_total=aco_weekdays_target_daily_total,
                                                                                max_weekday_lessons_group=aco_weekdays_max_weekday_lessons,
                                                                                max_weekend_lessons_group=aco_weekdays_max_weekend_lessons,
-                                                                               fitness_variance_penalty=aco_weekdays_fitness_variance_penalty)
+                                                                               fitness_variance_penalty=aco_weekdays_fitness_variance_penalty,
+                                                                               engine=aco_weekdays_engine,
+                                                                               capacity_aware=aco_weekdays_capacity_aware)
         logger.info(f"Task_{task_id_for_progress}: Шаг 5 - Квоты пар по дням распределены.")
-        await update_progress(5, "Распределение квот пар по дням недели завершено.")
+        update_progress(5, "Распределение квот пар по дням недели завершено.")
         final_weekly_schedule = {};
         generated_excel_files = []
-        mutable_lessons_pool = copy.deepcopy(all_lessons_pool_per_group)
+        lesson_pools = {group_name: LessonPool(group_lessons, special_room_overrides)
+                        for group_name, group_lessons in copy.deepcopy(all_lessons_pool_per_group).items()}
         num_week_days = len(DAYS_OF_WEEK)
-        logger.info(f"Task_{task_id_for_progress}: Шаг 6 - Начало цикла по дням недели ({num_week_days} дней)")
+        logger.info(f"Task_{task_id_for_progress}: Шаг 6 - Отбор уроков по квотам для всех дней ({num_week_days} дней)")
+        daily_scheduler_jobs = {}
         for day_idx, day_name in enumerate(DAYS_OF_WEEK):
-            logger.debug(f"Task_{task_id_for_progress}:  Планирование дня {day_idx + 1}/{num_week_days} - {day_name}")
-            await update_progress(6, f"Планирование дня: {day_name}", sub_progress=day_idx + 1, sub_total=num_week_days)
+            logger.debug(f"Task_{task_id_for_progress}:  Отбор уроков дня {day_idx + 1}/{num_week_days} - {day_name}")
             lessons_to_schedule_today = {};
             day_quotas = daily_lessons_quota_distribution.get(day_name, {});
             has_lessons_for_any_group_today = False
@@ -128,37 +307,16 @@ async def generate_full_schedule(
                 logger.debug(f"Task_{task_id_for_progress}:    Квоты на {day_name}: {str(day_quotas)[:200]}...")
                 for group_name, num_lessons_quota in day_quotas.items():
                     if num_lessons_quota <= 0: lessons_to_schedule_today.pop(group_name, None); continue
-                    group_total_lesson_pool = mutable_lessons_pool.get(group_name, [])
-                    selected_lessons_for_group_today = []
-                    if not group_total_lesson_pool: logger.warning(
+                    group_lesson_pool = lesson_pools.get(group_name)
+                    if not group_lesson_pool: logger.warning(
                         f"Task_{task_id_for_progress}: Для группы {group_name} на {day_name} квота {num_lessons_quota}, но уроки в общем пуле закончились."); lessons_to_schedule_today.pop(
                         group_name, None); continue
-                    priority_lessons = [];
-                    regular_lessons = []
-                    for lesson in group_total_lesson_pool:
-                        if lesson['name'] in special_room_overrides or lesson.get('placement_priority', 0) > 0:
-                            priority_lessons.append(lesson)
-                        else:
-                            regular_lessons.append(lesson)
-                    priority_lessons.sort(key=lambda lsn: (not (lsn['name'] in special_room_overrides),
-                                                           -lsn.get('placement_priority', 0)))
-                    random.shuffle(regular_lessons)
-                    num_to_select_from_priority = min(num_lessons_quota, len(priority_lessons))
-                    for _ in range(num_to_select_from_priority):
-                        if priority_lessons: selected_lessons_for_group_today.append(priority_lessons.pop(0))
-                    remaining_quota = num_lessons_quota - len(selected_lessons_for_group_today)
-                    num_to_select_from_regular = min(remaining_quota, len(regular_lessons))
-                    for _ in range(num_to_select_from_regular):
-                        if regular_lessons: selected_lessons_for_group_today.append(regular_lessons.pop(0))
-                    new_pool_for_group = [];
-                    new_pool_for_group.extend(priority_lessons);
-                    new_pool_for_group.extend(regular_lessons)
-                    mutable_lessons_pool[group_name] = new_pool_for_group
+                    selected_lessons_for_group_today = group_lesson_pool.take(num_lessons_quota)
                     if selected_lessons_for_group_today:
                         lessons_to_schedule_today[group_name] = selected_lessons_for_group_today;
                         has_lessons_for_any_group_today = True
                         logger.debug(
-                            f"Task_{task_id_for_progress}:      Для группы {group_name} на {day_name} выбрано {len(selected_lessons_for_group_today)}/{num_lessons_quota} уроков (приоритет учтен). В общем пуле осталось: {len(mutable_lessons_pool.get(group_name, []))}")
+                            f"Task_{task_id_for_progress}:      Для группы {group_name} на {day_name} выбрано {len(selected_lessons_for_group_today)}/{num_lessons_quota} уроков (приоритет учтен). В общем пуле осталось: {len(group_lesson_pool)}")
                     if len(
                         selected_lessons_for_group_today) < num_lessons_quota and num_lessons_quota > 0: logger.warning(
                         f"Task_{task_id_for_progress}: Для группы {group_name} на {day_name} квота {num_lessons_quota}, но удалось выбрать только {len(selected_lessons_for_group_today)}.")
@@ -167,48 +325,47 @@ async def generate_full_schedule(
             if not has_lessons_for_any_group_today:
                 logger.info(f"Task_{task_id_for_progress}:    На {day_name} нет уроков для фактического планирования.")
                 final_weekly_schedule[day_name] = {};
-                excel_filename_for_day = os.path.join(output_dir, f"{day_name}.xlsx")
-                create_schedule_excel({}, excel_filename_for_day, day_name);
-                generated_excel_files.append(excel_filename_for_day)
                 continue
-            group_available_times_today = create_group_workday_times_dict(processed_groups_data, day_name)
-            group_available_rooms_today = create_group_rooms_dict(processed_groups_data)
-            logger.info(
-                f"Task_{task_id_for_progress}:    Запуск DailySchedulerACO для {day_name} с {sum(len(lst) for lst in lessons_to_schedule_today.values())} уроками.")
-            daily_scheduler = DailySchedulerACO(
+            daily_scheduler_jobs[day_name] = dict(
+                aco_scheduler_params,
                 lessons_for_day_by_group=lessons_to_schedule_today,
-                group_available_times_on_day=group_available_times_today,
-                group_available_rooms_on_day=group_available_rooms_today,
-                special_room_overrides=special_room_overrides,
-                num_ants=aco_daily_num_ants,
-                num_iterations=aco_daily_num_iterations,
-                evaporation_rate=aco_daily_evaporation_rate,
-                pheromone_deposit_amount=aco_daily_pheromone_deposit,
-                alpha=aco_daily_alpha,
-                beta=aco_daily_beta,
-                penalty_unplaced_lesson=aco_daily_penalty_unplaced,
-                penalty_window_slot=aco_daily_penalty_window,
-                penalty_max_lessons_group_soft_coeff=aco_daily_penalty_max_lessons_coeff,
-                soft_limit_max_lessons_group=aco_daily_soft_limit_max_lessons,
-                penalty_slot_underutilization_coeff=aco_daily_penalty_slot_underutil_coeff,
-                slot_utilization_threshold=aco_daily_slot_util_threshold,
-                max_consecutive_lessons_for_group=aco_daily_max_consecutive_lessons,
-                penalty_consecutive_lessons=aco_daily_penalty_consecutive
+                group_available_times_on_day=create_group_workday_times_dict(processed_groups_data, day_name),
+                group_available_rooms_on_day=create_group_rooms_dict(processed_groups_data),
+                random_seed=None if random_seed is None else random_seed + day_idx
             )
-            best_schedule_for_this_day = daily_scheduler.run_aco()
+        if time_budget_seconds:
+            day_time_budgets = _split_time_budget(time_budget_seconds, {
+                day_name: sum(len(lst) for lst in job['lessons_for_day_by_group'].values())
+                for day_name, job in daily_scheduler_jobs.items()})
+            for day_name, day_time_budget in day_time_budgets.items():
+                day_time_limit = daily_scheduler_jobs[day_name]['time_limit_seconds']
+                daily_scheduler_jobs[day_name]['time_limit_seconds'] = min(day_time_budget, day_time_limit) if day_time_limit else day_time_budget
+            logger.info(f"Task_{task_id_for_progress}: Бюджет времени по дням (с): { {d: round(b, 2) for d, b in day_time_budgets.items()} }")
+        days_done = num_week_days - len(daily_scheduler_jobs)
+        logger.info(
+            f"Task_{task_id_for_progress}: Шаг 6 - Запуск DailySchedulerACO для {len(daily_scheduler_jobs)} дней (процессов: {aco_daily_parallel_workers or os.cpu_count()}).")
+        update_progress(6, f"Планирование дней: {', '.join(daily_scheduler_jobs) or '-'}", sub_progress=days_done,
+                        sub_total=num_week_days)
+        for day_name, best_schedule_for_this_day, best_fitness_for_this_day in _run_daily_schedulers(
+                daily_scheduler_jobs, aco_daily_parallel_workers, aco_daily_islands, aco_daily_island_exchange_interval,
+                aco_daily_decompose):
+            days_done += 1
             final_weekly_schedule[day_name] = best_schedule_for_this_day
-            os.makedirs(output_dir, exist_ok=True);
+            logger.info(
+                f"Task_{task_id_for_progress}:    Расписание на {day_name} создано. Фитнес: {best_fitness_for_this_day}")
+            update_progress(6, f"Расписание на {day_name} составлено.", sub_progress=days_done, sub_total=num_week_days)
+        os.makedirs(output_dir, exist_ok=True);
+        for day_name in DAYS_OF_WEEK:
             excel_filename_for_day = os.path.join(output_dir, f"{day_name}.xlsx")
-            create_schedule_excel(best_schedule_for_this_day, excel_filename_for_day, day_name)
+            create_schedule_excel(final_weekly_schedule.get(day_name, {}), excel_filename_for_day, day_name)
             generated_excel_files.append(excel_filename_for_day)
-            logger.info(
-                f"Task_{task_id_for_progress}:    Расписание на {day_name} создано. Фитнес: {daily_scheduler.best_fitness_for_day if hasattr(daily_scheduler, 'best_fitness_for_day') else 'N/A'}")
-        remaining_lessons_overall = sum(len(ll) for ll in mutable_lessons_pool.values() if ll)
+        final_weekly_schedule = {day_name: final_weekly_schedule.get(day_name, {}) for day_name in DAYS_OF_WEEK}
+        remaining_lessons_overall = sum(len(group_lesson_pool) for group_lesson_pool in lesson_pools.values())
         final_user_message = "Генерация успешно завершена!"
         if remaining_lessons_overall > 0:
             final_user_message = f"Генерация завершена. ВНИМАНИЕ: {remaining_lessons_overall} уроков не удалось распределить по дням (возможно, из-за конфликтов или нехватки слотов/аудиторий)."
             logger.warning(f"Task_{task_id_for_progress}: {final_user_message}")
-        await update_progress(total_major_steps, final_user_message, sub_progress=num_week_days,
+        update_progress(total_major_steps, final_user_message, sub_progress=num_week_days,
                               sub_total=num_week_days)
         logger.info(f"Task_{task_id_for_progress}: generate_full_schedule успешно завершается. {final_user_message}")
         return {"status": "success", "files": generated_excel_files, "data": final_weekly_schedule,
@@ -220,8 +377,23 @@ async def generate_full_schedule(
             f"Task_{task_id_for_progress}: ИСКЛЮЧЕНИЕ в generate_full_schedule на этапе '{current_step_msg}': {e}\n{tb_str}")
         if progress_callback:
             try:
-                await progress_callback(
+                progress_callback(
                     f"Задача #{task_id_for_progress}\n[ОШИБКА] {hd.quote(current_step_msg)}: {hd.quote(type(e).__name__)}")
             except Exception:
                 pass
-        return {"status": "error", "message": error_message_for_user}
\ No newline at end of file
+        return {"status": "error", "message": error_message_for_user}
+
+
+async def generate_full_schedule(groups_csv_path: str, weekdays_csv_path: str, output_dir: str,
+                                 progress_callback: callable = None, task_id_for_progress: int = 0,
+                                 **algo_params) -> dict:
+    # Синхронное ядро выполняется в потоке, чтобы не блокировать event loop бота;
+    # progress_callback здесь асинхронный и вызывается обратно в цикле событий.
+    loop = asyncio.get_running_loop()
+    sync_progress_callback = None
+    if progress_callback:
+        def sync_progress_callback(message: str):
+            asyncio.run_coroutine_threadsafe(progress_callback(message), loop)
+    return await loop.run_in_executor(
+        None, lambda: generate_full_schedule_sync(groups_csv_path, weekdays_csv_path, output_dir,
+                                                  sync_progress_callback, task_id_for_progress, **algo_params))
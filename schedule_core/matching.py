@@ -0,0 +1,78 @@
+from collections import deque
+
+# Максимальное паросочетание в двудольном графе "уроки слота - аудитории" (Hopcroft-Karp).
+# adjacency[i] - список аудиторий (правых вершин), допустимых для урока i, в порядке предпочтения.
+# match_left[i] - аудитория урока i или -1, match_right[r] - урок в аудитории r или -1.
+
+INF_DISTANCE = float('inf')
+
+
+def hopcroft_karp(adjacency: list, num_right: int) -> tuple:
+    match_left = [-1] * len(adjacency)
+    match_right = [-1] * num_right
+    while True:
+        distance = _bfs_layers(adjacency, match_left, match_right)
+        if distance is None: break
+        for left_vertex in range(len(adjacency)):
+            if match_left[left_vertex] == -1:
+                _dfs_augment(adjacency, match_left, match_right, distance, left_vertex)
+    return match_left, match_right
+
+
+def _bfs_layers(adjacency: list, match_left: list, match_right: list) -> (list | None):
+    # Слои от свободных уроков; None - увеличивающих путей нет
+    distance = [INF_DISTANCE] * len(adjacency)
+    queue = deque()
+    for left_vertex, right_vertex in enumerate(match_left):
+        if right_vertex == -1:
+            distance[left_vertex] = 0
+            queue.append(left_vertex)
+    found_free_right = False
+    while queue:
+        left_vertex = queue.popleft()
+        for right_vertex in adjacency[left_vertex]:
+            next_left = match_right[right_vertex]
+            if next_left == -1:
+                found_free_right = True
+            elif distance[next_left] == INF_DISTANCE:
+                distance[next_left] = distance[left_vertex] + 1
+                queue.append(next_left)
+    return distance if found_free_right else None
+
+
+def _dfs_augment(adjacency: list, match_left: list, match_right: list, distance: list, left_vertex: int) -> bool:
+    for right_vertex in adjacency[left_vertex]:
+        next_left = match_right[right_vertex]
+        if next_left == -1 or (distance[next_left] == distance[left_vertex] + 1
+                               and _dfs_augment(adjacency, match_left, match_right, distance, next_left)):
+            match_left[left_vertex] = right_vertex
+            match_right[right_vertex] = left_vertex
+            return True
+    distance[left_vertex] = INF_DISTANCE
+    return False
+
+
+def augment_from(adjacency: list, match_left: list, match_right: list, left_vertex: int) -> bool:
+    # Один увеличивающий путь от свободного урока left_vertex (добавление урока к готовому паросочетанию).
+    # Паросочетание меняется только при успехе.
+    parent_left = {}  # аудитория -> урок, из которого в нее пришли
+    visited_left = {left_vertex}
+    queue = deque([left_vertex])
+    while queue:
+        current_left = queue.popleft()
+        for right_vertex in adjacency[current_left]:
+            if right_vertex in parent_left: continue
+            parent_left[right_vertex] = current_left
+            next_left = match_right[right_vertex]
+            if next_left == -1:
+                while right_vertex != -1:  # Переворачиваем путь; у left_vertex match_left == -1, на нем цикл завершится
+                    path_left = parent_left[right_vertex]
+                    previous_right = match_left[path_left]
+                    match_left[path_left] = right_vertex
+                    match_right[right_vertex] = path_left
+                    right_vertex = previous_right
+                return True
+            if next_left not in visited_left:
+                visited_left.add(next_left)
+                queue.append(next_left)
+    return False
@@ -0,0 +1,48 @@
+from .additional_functions import create_group_workday_times_dict, create_group_rooms_dict
+from .ant_algoritm_weekdays import DAYS_OF_WEEK, WEEKEND_DAYS
+
+# Недельный режим: один Scheduler на всю неделю вместо квот по дням (ant_algoritm_weekdays) и семи
+# дневных колоний. Слот - пара (номер дня, время), поэтому феромон [пара, слот, аудитория] общий на неделю,
+# а муравей сам решает, в какой день поставить урок. Лимит пар группы в день из распределителя квот
+# остается жестким (day_lesson_limits: заполненный день исключается из вариантов группы), окна и серии пар
+# Scheduler считает внутри каждого дня.
+
+# Постоянная часть стоимости постановки урока в пересчете на слоты: на примере итерация недели (37 слотов)
+# стоит ~1.9 итерации всех семи дней (5-6 слотов в дне) при том же числе уроков
+PLACEMENT_OVERHEAD_SLOTS = 24
+
+
+def build_weekly_scheduler_job(groups_data: dict, lessons_pool_per_group: dict, max_weekday_lessons: int = 2,
+                               max_weekend_lessons: int = 3) -> dict:
+    # Аргументы Scheduler для всей недели: все уроки группы, ее свободные (день, время) и аудитории
+    group_available_times_on_week = {group_name: [] for group_name in groups_data}
+    for day_idx, day_name in enumerate(DAYS_OF_WEEK):
+        for group_name, times in create_group_workday_times_dict(groups_data, day_name).items():
+            group_available_times_on_week[group_name].extend((day_idx, time_slot) for time_slot in times)
+    return dict(
+        lessons_for_day_by_group={group_name: list(lessons_list) for group_name, lessons_list in lessons_pool_per_group.items()
+                                  if lessons_list},
+        group_available_times_on_day=group_available_times_on_week,
+        group_available_rooms_on_day=create_group_rooms_dict(groups_data),
+        multi_day=True,
+        day_lesson_limits=[max_weekend_lessons if day_name in WEEKEND_DAYS else max_weekday_lessons for day_name in DAYS_OF_WEEK])
+
+
+def weekly_iterations_for_daily_budget(num_iterations: int, group_available_times_on_week: dict) -> int:
+    # Итерации недельной колонии с той же работой, что у семи дневных запусков по num_iterations: уроков
+    # за итерацию столько же, но каждый урок выбирает из слотов всей недели, а не одного дня
+    times_by_day = {}
+    for times in group_available_times_on_week.values():
+        for day_idx, time_slot in times: times_by_day.setdefault(day_idx, set()).add(time_slot)
+    if not times_by_day: return num_iterations
+    week_slots = sum(len(times) for times in times_by_day.values())
+    mean_day_slots = week_slots / len(times_by_day)
+    return max(1, round(num_iterations * (PLACEMENT_OVERHEAD_SLOTS + mean_day_slots) / (PLACEMENT_OVERHEAD_SLOTS + week_slots)))
+
+
+def split_weekly_schedule(weekly_schedule: dict) -> dict:
+    # {(номер дня, время): [...]} -> {день: {время: [...]}} в формате дневных расписаний
+    schedule_by_day = {day_name: {} for day_name in DAYS_OF_WEEK}
+    for (day_idx, time_slot), items_in_slot in sorted(weekly_schedule.items()):
+        schedule_by_day[DAYS_OF_WEEK[day_idx]][time_slot] = items_in_slot
+    return schedule_by_day
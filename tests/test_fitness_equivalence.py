@@ -0,0 +1,205 @@
+import random
+
+import numpy as np
+import pytest
+
+from schedule_core.ant_algoritm_main import Scheduler
+
+# Инкрементальный фитнес муравья (_evaluate_ant, _move_fitness_delta) должен совпадать с полной оценкой
+# словаря-расписания (_evaluate_schedule) и с замороженной копией исходного оценщика (baseline_evaluate_schedule)
+# для всех режимов построения и для недельного режима.
+
+SLOTS = ["08:30", "10:10", "11:50", "13:30", "15:20", "17:00"]
+TAGS = ['компьютеры', 'проектор', 'химия']
+
+
+def make_day(seed: int, n_groups: int = 12, n_rooms: int = 6, multi_day: bool = False):
+    rnd = random.Random(seed)
+    rooms = [{'name': str(100 + r), 'tags': ['общая'] if rnd.random() < 0.6 else rnd.sample(TAGS, rnd.randint(1, 2))}
+             for r in range(n_rooms)]
+    subjects = [{'name': f'Предмет {i}', 'required_tags': [] if rnd.random() < 0.6 else [rnd.choice(TAGS)],
+                 'placement_priority': rnd.randint(0, 2)} for i in range(6)]
+    lessons, times, group_rooms = {}, {}, {}
+    for g in range(n_groups):
+        group_name = f'Группа-{g}'
+        lessons[group_name] = [dict(rnd.choice(subjects)) for _ in range(rnd.randint(1, 5))]
+        if multi_day:
+            times[group_name] = [(day_idx, t) for day_idx in range(3) for t in rnd.sample(SLOTS, rnd.randint(1, 4))]
+        else:
+            times[group_name] = rnd.sample(SLOTS, rnd.randint(2, len(SLOTS)))
+        group_rooms[group_name] = [dict(room) for room in rnd.sample(rooms, rnd.randint(1, n_rooms))]
+    return lessons, times, group_rooms
+
+
+def build_scheduler(seed: int, multi_day: bool = False, **kwargs) -> Scheduler:
+    lessons, times, group_rooms = make_day(seed, multi_day=multi_day)
+    rnd = random.Random(seed)
+    params = dict(num_ants=4, num_iterations=2, evaporation_rate=0.1, pheromone_deposit_amount=100.0, random_seed=seed,
+                  penalty_unplaced_lesson=rnd.randint(5, 30), penalty_window_slot=rnd.randint(1, 10),
+                  penalty_max_lessons_group_soft_coeff=rnd.randint(1, 5), soft_limit_max_lessons_group=rnd.randint(2, 4),
+                  max_consecutive_lessons_for_group=rnd.randint(1, 3), penalty_consecutive_lessons=rnd.randint(1, 10))
+    if multi_day: params.update(multi_day=True, day_lesson_limits=[2, 2, 3])
+    params.update(kwargs)
+    return Scheduler(lessons, times, group_rooms, {}, **params)
+
+
+def baseline_groups_penalty(scheduler: Scheduler, schedule: dict, all_day_slots_sorted: list) -> float:
+    # Копия перебора групп из исходного Scheduler._evaluate_schedule (до индексов и кэшей штрафов), не менять
+    fitness = 0.0
+    for group_name in scheduler.lessons_for_day_by_group.keys():
+        group_lessons_indices = []
+        for time_slot, lessons_at_time in schedule.items():
+            for lesson_item in lessons_at_time:
+                if lesson_item['group'] == group_name and time_slot in all_day_slots_sorted:
+                    group_lessons_indices.append(all_day_slots_sorted.index(time_slot))
+        if not group_lessons_indices: continue
+        group_lessons_indices.sort()
+        window_penalty = 0
+        consecutive_lessons_count = 1
+        for i in range(len(group_lessons_indices) - 1):
+            diff = group_lessons_indices[i + 1] - group_lessons_indices[i]
+            if diff > 1:  # Окно
+                window_penalty += (diff - 1) * scheduler.penalty_window_slot
+                if consecutive_lessons_count > scheduler.max_consecutive_lessons_for_group:
+                    fitness += (consecutive_lessons_count - scheduler.max_consecutive_lessons_for_group) * scheduler.penalty_consecutive_lessons
+                consecutive_lessons_count = 1
+            else:  # diff == 1, пары подряд
+                consecutive_lessons_count += 1
+        if consecutive_lessons_count > scheduler.max_consecutive_lessons_for_group:
+            fitness += (consecutive_lessons_count - scheduler.max_consecutive_lessons_for_group) * scheduler.penalty_consecutive_lessons
+        fitness += window_penalty
+        if len(group_lessons_indices) > scheduler.soft_limit_max_lessons_group:
+            fitness += (len(group_lessons_indices) - scheduler.soft_limit_max_lessons_group) * scheduler.penalty_max_lessons_group_soft_coeff
+    return fitness
+
+
+def baseline_evaluate_schedule(scheduler: Scheduler, schedule: dict, constraints_violated_penalty: int) -> float:
+    # Исходная оценка; для multi_day перебор групп идет по каждому дню отдельно (слоты дня - его времена),
+    # а непоставленные уроки, загрузка и конфликты считаются по всей неделе
+    fitness = float(constraints_violated_penalty)
+    total_lessons_to_place = sum(len(l_list) for l_list in scheduler.lessons_for_day_by_group.values())
+    placed_lessons_count = sum(len(items_in_slot) for items_in_slot in schedule.values())
+    fitness += (total_lessons_to_place - placed_lessons_count) * scheduler.penalty_unplaced_lesson
+    unique_day_time_slots_set = set()
+    for group_slots in scheduler.group_available_times_on_day.values():
+        unique_day_time_slots_set.update(group_slots)
+    if scheduler.multi_day:
+        for day_idx in sorted({time_slot[0] for time_slot in unique_day_time_slots_set}):
+            day_schedule = {time_slot: items for time_slot, items in schedule.items() if time_slot[0] == day_idx}
+            day_slots_sorted = sorted(time_slot for time_slot in unique_day_time_slots_set if time_slot[0] == day_idx)
+            fitness += baseline_groups_penalty(scheduler, day_schedule, day_slots_sorted)
+    else:
+        fitness += baseline_groups_penalty(scheduler, schedule, sorted(unique_day_time_slots_set))
+    total_possible_placements = sum(len(times) for times in scheduler.group_available_times_on_day.values())
+    utilization_ratio = placed_lessons_count / total_possible_placements if total_possible_placements > 0 else 1.0
+    if utilization_ratio < scheduler.slot_utilization_threshold:
+        fitness += (1.0 - utilization_ratio) * scheduler.penalty_slot_underutilization_coeff
+    for time_slot, scheduled_items_at_time in schedule.items():
+        groups_at_time = set();
+        rooms_at_time = set()
+        for item in scheduled_items_at_time:
+            if item['group'] in groups_at_time: fitness += 1000
+            groups_at_time.add(item['group'])
+            if item['room']['name'] in rooms_at_time: fitness += 1000
+            rooms_at_time.add(item['room']['name'])
+    return fitness
+
+
+def baseline_fitness(scheduler: Scheduler, ant) -> float:
+    schedule = scheduler._assignment_to_schedule(ant.slot_of, ant.room_of)
+    return baseline_evaluate_schedule(scheduler, schedule, ant.constraints_violated)
+
+
+def assert_ant_fitness_matches_schedule(scheduler: Scheduler, ant):
+    schedule = scheduler._assignment_to_schedule(ant.slot_of, ant.room_of)
+    assert scheduler._evaluate_ant(ant) == pytest.approx(
+        scheduler._evaluate_schedule(schedule, ant.constraints_violated), abs=1e-9)
+    assert scheduler._evaluate_ant(ant) == pytest.approx(baseline_fitness(scheduler, ant), abs=1e-9)
+
+
+MODES = [
+    dict(),
+    dict(assignment_mode='slot_then_room'),
+    dict(lesson_ordering='priority'),
+    dict(lesson_ordering='most_constrained'),
+    dict(candidate_list_size=4),
+    dict(multi_day=True),
+    dict(multi_day=True, assignment_mode='slot_then_room'),
+]
+
+
+@pytest.mark.parametrize('mode', MODES, ids=lambda mode: ','.join(f'{k}={v}' for k, v in mode.items()) or 'default')
+@pytest.mark.parametrize('seed', range(8))
+def test_constructed_ants_fitness_matches_full_evaluation(mode, seed):
+    scheduler = build_scheduler(seed, **mode)
+    if scheduler.candidate_list_size: scheduler._rebuild_candidate_lists(); scheduler._refresh_candidate_scores()
+    scheduler._create_ants()
+    for ant in scheduler.ants:
+        scheduler._construct_schedule_for_ant(ant)
+        assert_ant_fitness_matches_schedule(scheduler, ant)
+
+
+@pytest.mark.parametrize('multi_day', [False, True])
+@pytest.mark.parametrize('seed', range(8))
+def test_random_assignments_and_move_deltas_match_full_evaluation(multi_day, seed):
+    # Случайные допустимые назначения (без учета лимитов дня) и случайные локальные ходы
+    scheduler = build_scheduler(seed, multi_day=multi_day, day_lesson_limits=None)
+    rng = np.random.default_rng(seed)
+    num_lessons = len(scheduler.lesson_items)
+    slot_of = np.full(num_lessons, -1, dtype=np.int32)
+    room_of = np.full(num_lessons, -1, dtype=np.int32)
+    group_busy = np.zeros_like(scheduler.group_slot_mask)
+    room_busy = np.zeros((len(scheduler.room_catalogue), len(scheduler.slot_names)), dtype=bool)
+    for lesson_idx in rng.permutation(num_lessons).tolist():
+        group_idx = scheduler.lesson_group_ids[lesson_idx]
+        free_cells = np.flatnonzero((scheduler.group_slot_mask[group_idx] & ~group_busy[group_idx])[:, None]
+                                    & scheduler.lesson_room_mask[lesson_idx][None, :] & ~room_busy.T)
+        if free_cells.size == 0 or rng.random() < 0.2: continue
+        slot_idx, room_idx = divmod(int(rng.choice(free_cells)), len(scheduler.room_catalogue))
+        slot_of[lesson_idx], room_of[lesson_idx] = slot_idx, room_idx
+        group_busy[group_idx, slot_idx] = room_busy[room_idx, slot_idx] = True
+    ant = scheduler._ant_from_assignment(slot_of, room_of, rng)
+    assert ant.fitness == pytest.approx(scheduler._evaluate_ant(ant), abs=1e-9)
+    assert_ant_fitness_matches_schedule(scheduler, ant)
+    for _ in range(50):
+        move = scheduler._sample_local_move(ant, int(rng.integers(num_lessons)))
+        if move is None: continue
+        fitness_before = baseline_fitness(scheduler, ant)
+        scheduler._apply_local_move(ant, move)
+        assert move[0] == pytest.approx(baseline_fitness(scheduler, ant) - fitness_before, abs=1e-9)
+        assert ant.fitness == pytest.approx(scheduler._evaluate_ant(ant), abs=1e-9)
+        assert_ant_fitness_matches_schedule(scheduler, ant)
+
+
+def brute_force_candidate_count(scheduler: Scheduler, ant, lesson_idx: int, phase_slot_of=None) -> int:
+    # Число вариантов урока по текущему состоянию муравья, без инкрементальных счетчиков
+    group_idx = scheduler.lesson_group_ids[lesson_idx]
+    if phase_slot_of is None:
+        return int(scheduler._get_free_candidates_mask(ant, group_idx, scheduler.lesson_room_mask[lesson_idx]).sum())
+    slot_supply = np.maximum(len(scheduler.room_catalogue) - np.bincount(phase_slot_of[phase_slot_of >= 0],
+                                                                         minlength=len(scheduler.slot_names)), 0)
+    free_slots = scheduler._group_free_slots(ant, group_idx)
+    return int(np.minimum(scheduler.lesson_room_counts[lesson_idx], slot_supply[free_slots]).sum())
+
+
+@pytest.mark.parametrize('assignment_mode', ['joint', 'slot_then_room'])
+@pytest.mark.parametrize('multi_day', [False, True])
+@pytest.mark.parametrize('seed', range(12))
+def test_most_constrained_picks_lesson_with_fewest_candidates(assignment_mode, multi_day, seed):
+    # Инкрементальные счетчики 'most_constrained' сверяются с пересчетом перед каждым выбором урока,
+    # в том числе когда урок заполняет день группы до day_lesson_limits
+    scheduler = build_scheduler(seed, multi_day=multi_day, lesson_ordering='most_constrained', assignment_mode=assignment_mode)
+    iter_lessons_for_ant = scheduler._iter_lessons_for_ant
+
+    def checked_iter_lessons_for_ant(ant, phase_slot_of=None):
+        remaining_lessons = set(range(len(scheduler.lesson_items)))
+        for lesson_idx in iter_lessons_for_ant(ant, phase_slot_of):
+            counts = {idx: brute_force_candidate_count(scheduler, ant, idx, phase_slot_of) for idx in remaining_lessons}
+            assert counts[lesson_idx] == min(counts.values())
+            remaining_lessons.discard(lesson_idx)
+            yield lesson_idx
+
+    scheduler._iter_lessons_for_ant = checked_iter_lessons_for_ant
+    scheduler._create_ants()
+    for ant in scheduler.ants:
+        scheduler._construct_schedule_for_ant(ant)
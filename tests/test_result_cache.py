@@ -0,0 +1,34 @@
+import asyncio
+import os
+
+from bot.models import algorithm_runner
+from bot.utils import result_cache
+
+
+def test_identical_default_run_is_served_from_cache(tmp_path, monkeypatch):
+    # Бот не задает random_seed: повторный запуск с теми же файлами должен брать расписание из кэша
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(result_cache, "STATS_PATH", str(tmp_path / "cache" / "stats.json"))
+    monkeypatch.setattr(algorithm_runner, "GENERATION_POOL_WORKERS", 0)
+    os.makedirs(result_cache.RESULT_CACHE_DIR)
+    generation_seeds = []
+
+    async def fake_generate_full_schedule(progress_callback=None, **generation_kwargs):
+        generation_seeds.append(generation_kwargs["random_seed"])
+        os.makedirs(generation_kwargs["output_dir"], exist_ok=True)
+        excel_path = os.path.join(generation_kwargs["output_dir"], "Понедельник.xlsx")
+        with open(excel_path, "wb") as f: f.write(b"xlsx")
+        return {"status": "success", "files": [excel_path], "data": {}, "message": "Генерация успешно завершена!"}
+
+    monkeypatch.setattr(algorithm_runner, "generate_full_schedule", fake_generate_full_schedule)
+    groups_path, weekdays_path = tmp_path / "groups.xlsx", tmp_path / "weekdays.xlsx"
+    groups_path.write_bytes(b"groups")
+    weekdays_path.write_bytes(b"weekdays")
+    results = [asyncio.run(algorithm_runner.run_schedule_generation_async(
+        str(groups_path), str(weekdays_path), str(tmp_path / f"out{task_id}"), task_id)) for task_id in (1, 2)]
+    assert len(generation_seeds) == 1 and generation_seeds[0] is not None
+    assert [result["status"] for result in results] == ["success", "success"]
+    assert results[1]["files"] == [str(tmp_path / "out2" / "Понедельник.xlsx")]
+    assert os.path.exists(results[1]["files"][0])
+    stats = result_cache.get_cache_stats()
+    assert stats["hits"] == 1 and stats["entries"] == 1